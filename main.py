@@ -6,17 +6,62 @@ import json
 import os
 import shutil
 import ctypes
+import queue
+import threading
+import zlib
 from pathlib import Path
-import cv2
-import numpy as np
-from mss import mss
 
 from PyQt6.QtWidgets import (QApplication, QMainWindow, QVBoxLayout, 
                              QHBoxLayout, QLabel, QLineEdit, QPushButton, 
                              QComboBox, QSlider, QFrame, QGraphicsDropShadowEffect)
-from PyQt6.QtCore import Qt, QThread, pyqtSignal, QTimer
+from PyQt6.QtCore import Qt, QThread, QMutex, pyqtSignal, QTimer
 from PyQt6.QtGui import QImage, QPixmap, QColor, QIcon
 
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# cv2 / numpy / mss 及可选的 turbojpeg、dxcam 会加载大量原生库，
+# 推流开始时才由 load_capture_stack() 导入，让窗口先显示出来
+cv2 = None
+np = None
+mss = None
+TurboJPEG = None
+dxcam = None
+
+# TCP 帧头: 4 字节大端帧长度
+FRAME_HEADER = struct.Struct(">L")
+# 采集区域达到该像素数时才考虑 GPU 编码，小画面上传显存的开销大于收益
+GPU_ENCODE_MIN_PIXELS = 1280 * 720
+# UDP 单帧上限，超过则丢弃 (单个数据报需低于 64KB)
+MAX_UDP_PAYLOAD = 60000
+# 发送队列长度：编码与发送并行，发送跟不上时丢弃新帧而不是阻塞采集
+SEND_QUEUE_SIZE = 2
+SEND_BUFFER_BYTES = 4 * 1024 * 1024
+# 画面未变化时跳过编码发送，但至少每隔该时间重发一帧 (保活 + 纠正抽样漏检)
+STATIC_REFRESH_INTERVAL = 0.5
+# 变化检测只对每隔 N 行抽样做校验
+CHANGE_SAMPLE_ROW_STEP = 8
+
+
+def load_capture_stack():
+    global cv2, np, mss, TurboJPEG, TJPF_BGRA, TJSAMP_420, TJFLAG_FASTDCT, dxcam
+    if cv2 is not None:
+        return
+    import numpy as np
+    from mss import mss
+    try:
+        from turbojpeg import TurboJPEG, TJPF_BGRA, TJSAMP_420, TJFLAG_FASTDCT
+    except ImportError:
+        TurboJPEG = None
+    try:
+        import dxcam
+    except ImportError:
+        dxcam = None
+    # cv2 最后导入，同时作为已加载的标记
+    import cv2
+
 # ===========================
 # 1. 核心推流工作线程 (逻辑不变)
 # ===========================
@@ -29,17 +74,226 @@ class StreamWorker(QThread):
         super().__init__()
         self.is_running = False
         self.sock = None
+        self._sock_key = None
+        self._send_failed = False
         self.ip = "127.0.0.1"
         self.port = 7878
         self.width = 256
         self.height = 256
-        self.quality = 80
         self.fps_limit = 120
         self.protocol = "TCP"
+        self.preview_width = 0
+        self.preview_height = 0
+        self._tj = None
+        self.quality = 80
+        self._backend = "mss"
+        self._camera = None
+        self._gpu_jpeg = None
+        self._preview_interval = 1.0 / 30.0
+        self._last_preview = 0.0
+        # 预览图像复用同一块缓冲区；工作线程写入和界面线程读取时都需持有该锁
+        self.preview_lock = QMutex()
+        self._preview_buf = None
+        self.preview_image = QImage()
+        # 界面线程还没处理完上一帧预览时不再投递新帧，避免事件队列积压
+        self.preview_in_flight = False
+
+    @property
+    def quality(self):
+        return self._quality
+
+    @quality.setter
+    def quality(self, value):
+        self._quality = value
+        self._update_encode_params()
+
+    def _update_encode_params(self):
+        # 编码参数只在画质变化时重建，避免每帧分配；编码库加载前先不处理
+        if cv2 is None:
+            return
+        self._encode_param = [int(cv2.IMWRITE_JPEG_QUALITY), self._quality]
+        self._tj_flags = TJFLAG_FASTDCT if self._tj is not None and self._quality < 90 else 0
+
+    def open_capture(self, sct, region):
+        # 返回采集函数 (返回 BGRA ndarray)。Windows 上优先使用 DXGI Desktop
+        # Duplication (dxcam)，画面由 GPU 直接拷出，比 mss 的 GDI BitBlt 快得多
+        camera = self._start_dxcam(region)
+        if camera is not None:
+            self._backend = "dxcam"
+            get_latest_frame = camera.get_latest_frame
+            ascontiguousarray = np.ascontiguousarray
+
+            def grab_frame():
+                return ascontiguousarray(get_latest_frame())
+            return grab_frame
+
+        self._backend = "mss"
+        grab = sct.grab
+        frombuffer = np.frombuffer
+        uint8 = np.uint8
+
+        def grab_frame():
+            # 直接包装 mss 的原始缓冲区，避免 np.array 再复制一整帧；
+            # 返回的帧只在下一次 grab 之前有效，需在此之前完成预览和编码
+            shot = grab(region)
+            return frombuffer(shot.raw, dtype=uint8).reshape(shot.height, shot.width, 4)
+        return grab_frame
+
+    def _start_dxcam(self, region):
+        if dxcam is None:
+            return None
+        left = region["left"]
+        top = region["top"]
+        try:
+            # dxcam 按输出缓存实例，重复推流时沿用同一个
+            if self._camera is None:
+                self._camera = dxcam.create(output_idx=0, output_color="BGRA")
+            # video_mode 在画面静止时也按目标帧率重复输出，避免取帧阻塞
+            self._camera.start(
+                region=(left, top, left + region["width"], top + region["height"]),
+                target_fps=self.fps_limit,
+                video_mode=True,
+            )
+            return self._camera
+        except Exception:
+            return None
+
+    def close_capture(self):
+        if self._backend != "dxcam" or self._camera is None:
+            return
+        try:
+            self._camera.stop()
+        except Exception:
+            pass
+
+    def ensure_preview_buffer(self, width, height):
+        buf = self._preview_buf
+        if buf is not None and buf.shape[:2] == (height, width):
+            return buf
+        buf = np.empty((height, width, 4), dtype=np.uint8)
+        self.preview_lock.lock()
+        try:
+            self._preview_buf = buf
+            self.preview_image = QImage(buf.data, width, height, 4 * width, QImage.Format.Format_RGB32)
+        finally:
+            self.preview_lock.unlock()
+        return buf
+
+    def make_frame_encoder(self, capture_w, capture_h):
+        # 按可用后端返回 BGRA -> JPEG 编码函数，在推流开始时选定一次。
+        # 各后端在编码期间都会释放 GIL (nvJPEG / OpenCV 原生代码 / ctypes 调用 libjpeg-turbo)
+        if capture_w * capture_h >= GPU_ENCODE_MIN_PIXELS:
+            encode_frame = self._make_gpu_frame_encoder()
+            if encode_frame is not None:
+                return encode_frame
+
+        tj = self._tj
+        if tj is not None:
+            tj_encode = tj.encode
+
+            def encode_frame(frame_bgra):
+                return tj_encode(frame_bgra, quality=self._quality, pixel_format=TJPF_BGRA,
+                                 jpeg_subsample=TJSAMP_420, flags=self._tj_flags)
+            return encode_frame
+
+        cvt_color = cv2.cvtColor
+        imencode = cv2.imencode
+
+        def encode_frame(frame_bgra):
+            frame_bgr = cvt_color(frame_bgra, cv2.COLOR_BGRA2BGR)
+            _, encimg = imencode('.jpg', frame_bgr, self._encode_param)
+            # 直接发送 numpy 缓冲区的只读视图，省去 tobytes() 的整帧复制
+            return memoryview(encimg).cast("B")
+        return encode_frame
+
+    def _make_gpu_frame_encoder(self):
+        if self._gpu_jpeg is None:
+            self._gpu_jpeg = load_gpu_jpeg_encoder() or False
+        if not self._gpu_jpeg:
+            return None
+        torch, encode_jpeg = self._gpu_jpeg
+        try:
+            device = torch.device("cuda")
+            bgr_to_rgb = torch.tensor([2, 1, 0], device=device)
+        except Exception as e:
+            # CUDA 初始化失败 (驱动异常等)，之后的推流都直接走 CPU 编码
+            print(f"Init GPU JPEG encoder failed: {e}")
+            self._gpu_jpeg = False
+            return None
+        from_numpy = torch.from_numpy
+
+        def encode_frame(frame_bgra):
+            # 上传后在 GPU 上完成通道重排 + nvJPEG 编码，只把压缩结果拷回内存
+            frame = from_numpy(frame_bgra).to(device, non_blocking=True)
+            frame_rgb = frame.index_select(2, bgr_to_rgb).permute(2, 0, 1).contiguous()
+            encoded = encode_jpeg(frame_rgb, quality=self._quality)
+            return memoryview(encoded.cpu().numpy()).cast("B")
+        return encode_frame
+
+    def _sender_loop(self, send, send_q):
+        get = send_q.get
+        try:
+            while True:
+                data = get()
+                if data is None:
+                    return
+                send(data)
+        except Exception as e:
+            self._send_failed = True
+            if self.is_running:
+                self.status_updated.emit(f"发送失败: {str(e)}")
+            self.is_running = False
 
     def request_stop(self):
+        # 采集循环一帧内即可退出；TCP 连接由 run() 的收尾逻辑关闭，
+        # UDP socket 留给下次推流复用
         self.is_running = False
+
+    def shutdown(self):
+        # 程序退出时释放跨推流复用的资源
+        self.close_socket()
+        if self._camera is not None:
+            try:
+                self._camera.release()
+            except Exception:
+                pass
+            self._camera = None
+
+    def open_socket(self, addr):
+        # 只有 UDP socket 会跨推流保留，目标未变时直接沿用；
+        # TCP 每次推流结束都会断开，接收端一次只服务一个连接
+        key = (self.protocol, addr)
         sock = self.sock
+        if sock is not None:
+            if key == self._sock_key:
+                self.status_updated.emit(f"UDP 发送中 -> {self.ip}:{self.port}")
+                return sock
+            self.close_socket()
+
+        if self.protocol == "TCP":
+            sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+            try:
+                sock.settimeout(3)
+                self.status_updated.emit(f"正在连接 TCP -> {self.ip}:{self.port}...")
+                sock.connect(addr)
+                sock.settimeout(None)
+                sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+            except BaseException:
+                sock.close()
+                raise
+            self.status_updated.emit(f"TCP 推流中-> {self.ip}")
+        else:
+            sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+            self.status_updated.emit(f"UDP 发送中 -> {self.ip}:{self.port}")
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_SNDBUF, SEND_BUFFER_BYTES)
+        self.sock = sock
+        self._sock_key = key
+        return sock
+
+    def close_socket(self):
+        sock = self.sock
+        self.sock = None
+        self._sock_key = None
         if not sock:
             return
         try:
@@ -53,100 +307,267 @@ class StreamWorker(QThread):
 
     def run(self):
         self.is_running = True
-        sock = None
         addr = (self.ip, self.port)
+        timer_resolution_set = False
+        send_q = None
+        sender_thread = None
+        sct = None
+        self._send_failed = False
         
         try:
+            load_capture_stack()
+            if self._tj is None:
+                self._tj = create_jpeg_encoder()
+            self._update_encode_params()
+
+            sock = self.open_socket(addr)
+
+            # mss 的 GDI / X11 句柄保存在线程局部存储里，每次推流都在本线程创建并关闭
+            sct = mss()
+            monitor = sct.monitors[1]
+            screen_w = monitor['width']
+            screen_h = monitor['height']
+            capture_w = min(self.width, screen_w)
+            capture_h = min(self.height, screen_h)
+            if capture_w <= 0 or capture_h <= 0:
+                raise ValueError("推流分辨率必须大于 0")
+            if capture_w != self.width or capture_h != self.height:
+                self.status_updated.emit(f"分辨率超出屏幕，已自动裁切为 {capture_w}x{capture_h}")
+            preview_w, preview_h = fit_preview_size(capture_w, capture_h, self.preview_width, self.preview_height)
+            scale_preview = (preview_w, preview_h) != (capture_w, capture_h)
+            self._last_preview = 0.0
+            self.preview_in_flight = False
+            fps_counter = 0
+            last_fps_time = time.perf_counter()
+            last_udp_warn_time = 0.0
+
+            # 中心裁切区域在推流期间不变，循环外计算一次
+            region = {
+                "top": (screen_h - capture_h) // 2,
+                "left": (screen_w - capture_w) // 2,
+                "width": capture_w,
+                "height": capture_h,
+            }
+
+            # 热循环中反复用到的方法先绑定为局部变量，省去每帧的属性查找
+            grab_frame = self.open_capture(sct, region)
+            resize = cv2.resize
+            encode_frame = self.make_frame_encoder(capture_w, capture_h)
+            emit_frame = self.frame_captured.emit
+            perf_counter = time.perf_counter
+            sleep = time.sleep
+            preview_buf = self.ensure_preview_buffer(preview_w, preview_h)
+            preview_image = self.preview_image
+            preview_lock = self.preview_lock
+            copyto = np.copyto
+            preview_interval = self._preview_interval
+            # 协议在推流期间不变，发送函数和 UDP 大小上限在这里一次性选定
             if self.protocol == "TCP":
-                sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-                sock.settimeout(3)
-                self.status_updated.emit(f"正在连接 TCP -> {self.ip}:{self.port}...")
-                sock.connect(addr)
-                sock.settimeout(None)
-                self.status_updated.emit(f"TCP 推流中-> {self.ip}")
+                send = make_tcp_sender(sock)
+                max_payload = sys.maxsize
             else:
-                sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
-                self.status_updated.emit(f"UDP 发送中 -> {self.ip}:{self.port}")
-            self.sock = sock
-
-            with mss() as sct:
-                monitor = sct.monitors[1]
-                screen_w = monitor['width']
-                screen_h = monitor['height']
-                capture_w = min(self.width, screen_w)
-                capture_h = min(self.height, screen_h)
-                if capture_w <= 0 or capture_h <= 0:
-                    raise ValueError("推流分辨率必须大于 0")
-                if capture_w != self.width or capture_h != self.height:
-                    self.status_updated.emit(f"分辨率超出屏幕，已自动裁切为 {capture_w}x{capture_h}")
-                fps_counter = 0
-                last_fps_time = time.time()
-                last_udp_warn_time = 0.0
-
-                while self.is_running:
-                    loop_start = time.time()
-
-                    # 计算中心裁切
-                    left = (screen_w - capture_w) // 2
-                    top = (screen_h - capture_h) // 2
-                    region = {"top": top, "left": left, "width": capture_w, "height": capture_h}
-
-                    img_bgra = np.array(sct.grab(region))
-                    frame_bgr = cv2.cvtColor(img_bgra, cv2.COLOR_BGRA2BGR)
-
-                    # UI预览 (BGR -> RGB)
-                    frame_rgb = cv2.cvtColor(frame_bgr, cv2.COLOR_BGR2RGB)
-                    h, w, ch = frame_rgb.shape
-                    qt_img = QImage(frame_rgb.data, w, h, ch * w, QImage.Format.Format_RGB888).copy()
-                    self.frame_captured.emit(qt_img)
-
-                    # 编码发送
-                    encode_param = [int(cv2.IMWRITE_JPEG_QUALITY), self.quality]
-                    _, encimg = cv2.imencode('.jpg', frame_bgr, encode_param)
-                    data = encimg.tobytes()
-
+                send = make_udp_sender(sock, addr)
+                max_payload = MAX_UDP_PAYLOAD
+            dropped_frames = 0
+            crc32 = zlib.crc32
+            last_checksum = None
+            last_sent_time = 0.0
+
+            # 独立发送线程：网络发送与下一帧的采集编码重叠进行
+            send_q = queue.Queue(maxsize=SEND_QUEUE_SIZE)
+            enqueue = send_q.put_nowait
+            sender_thread = threading.Thread(
+                target=self._sender_loop,
+                args=(send, send_q),
+                name="StreamSenderThread",
+                daemon=True,
+            )
+            sender_thread.start()
+
+            # Windows 默认 sleep 精度约 15.6ms，提高到 1ms 才能达到高帧率上限
+            timer_resolution_set = set_windows_timer_resolution(True)
+            next_deadline = perf_counter()
+
+            while self.is_running:
+                loop_start = perf_counter()
+
+                frame_bgra = grab_frame()
+
+                # UI预览 (约 30 FPS，先缩小到预览尺寸；小端下 BGRA 即 Qt 的 RGB32)
+                if not self.preview_in_flight and loop_start - self._last_preview >= preview_interval:
+                    self._last_preview = loop_start
+                    preview_lock.lock()
                     try:
-                        if self.protocol == "TCP":
-                            header = struct.pack(">L", len(data))
-                            sock.sendall(header + data)
+                        if scale_preview:
+                            resize(frame_bgra, (preview_w, preview_h), dst=preview_buf, interpolation=cv2.INTER_AREA)
+                        else:
+                            copyto(preview_buf, frame_bgra)
+                    finally:
+                        preview_lock.unlock()
+                    self.preview_in_flight = True
+                    emit_frame(preview_image)
+
+                # 画面静止时跳过编码与发送，只按 STATIC_REFRESH_INTERVAL 定期刷新
+                # 采样行本身是连续内存，逐行喂给 crc32，避免为抽行再复制一份
+                checksum = 0
+                for row in frame_bgra[::CHANGE_SAMPLE_ROW_STEP]:
+                    checksum = crc32(row, checksum)
+                if checksum != last_checksum or loop_start - last_sent_time >= STATIC_REFRESH_INTERVAL:
+                    # 编码发送 (优先 libjpeg-turbo SIMD 编码，缺失时回退 OpenCV)
+                    data = encode_frame(frame_bgra)
+                    if len(data) >= max_payload:
+                        now = perf_counter()
+                        if now - last_udp_warn_time >= 1.0:
+                            self.status_updated.emit(f"UDP 包过大({len(data)} bytes)，该帧已丢弃，请降低画质/分辨率")
+                            last_udp_warn_time = now
+                    else:
+                        try:
+                            enqueue(data)
+                        except queue.Full:
+                            dropped_frames += 1
                         else:
-                            if len(data) < 60000:
-                                sock.sendto(data, addr)
-                            else:
-                                now = time.time()
-                                if now - last_udp_warn_time >= 1.0:
-                                    self.status_updated.emit(f"UDP 包过大({len(data)} bytes)，该帧已丢弃，请降低画质/分辨率")
-                                    last_udp_warn_time = now
-                    except Exception as e:
-                        if self.is_running:
-                            self.status_updated.emit(f"发送失败: {str(e)}")
-                        break
-
-                    # FPS 统计与限制
-                    fps_counter += 1
-                    if time.time() - last_fps_time >= 1.0:
-                        self.fps_updated.emit(fps_counter)
-                        fps_counter = 0
-                        last_fps_time = time.time()
-
-                    elapsed = time.time() - loop_start
-                    wait_time = (1.0 / self.fps_limit) - elapsed
-                    if wait_time > 0:
-                        time.sleep(wait_time)
+                            # 只有真正进入发送队列才算已发送，丢弃的帧下次照样重发
+                            last_checksum = checksum
+                            last_sent_time = loop_start
+
+                # FPS 统计与限制
+                fps_counter += 1
+                now = perf_counter()
+                if now - last_fps_time >= 1.0:
+                    self.fps_updated.emit(fps_counter)
+                    if dropped_frames:
+                        self.status_updated.emit(f"发送跟不上采集，过去 1 秒丢弃 {dropped_frames} 帧")
+                        dropped_frames = 0
+                    fps_counter = 0
+                    last_fps_time = now
+
+                # 按单调截止时间限帧：先 sleep 到截止前 1ms，最后不足 2ms 的部分自旋等待
+                next_deadline += 1.0 / self.fps_limit
+                remaining = next_deadline - perf_counter()
+                if remaining > 0:
+                    if remaining > 0.002:
+                        sleep(remaining - 0.001)
+                    while perf_counter() < next_deadline:
+                        pass
+                else:
+                    # 已落后于截止时间，重新对齐，避免之后连续追帧
+                    next_deadline = perf_counter()
 
         except Exception as e:
             self.status_updated.emit(f"错误: {str(e)}")
         finally:
-            if sock:
+            if timer_resolution_set:
+                set_windows_timer_resolution(False)
+            self.close_capture()
+            if sct is not None:
+                try:
+                    sct.close()
+                except Exception:
+                    pass
+            if sender_thread is not None:
+                # 清空待发帧后放入结束标记，让发送线程尽快退出
                 try:
-                    sock.close()
-                except OSError:
+                    while True:
+                        send_q.get_nowait()
+                except queue.Empty:
                     pass
-            self.sock = None
+                send_q.put_nowait(None)
+                sender_thread.join(timeout=1.0)
+            # 接收端 listen(1) 且一次只处理一个连接，TCP 不断开会一直占住它，
+            # 其他发送端连上后也收不到画面；UDP 发送失败或卡住时同样不再复用
+            if self.protocol == "TCP" or self._send_failed or (
+                sender_thread is not None and sender_thread.is_alive()
+            ):
+                self.close_socket()
             self.is_running = False
             self.status_updated.emit("Stopped")
 
 
+def make_tcp_sender(sock):
+    pack_header = FRAME_HEADER.pack
+
+    def send(data):
+        sendmsg_all(sock, [pack_header(len(data)), data])
+    return send
+
+
+def make_udp_sender(sock, addr):
+    sendto = sock.sendto
+
+    def send(data):
+        sendto(data, addr)
+    return send
+
+
+def sendmsg_all(sock, buffers):
+    # 分散写出帧头和数据，避免为拼接再复制一次整帧
+    if not hasattr(socket.socket, "sendmsg"):
+        # Windows 没有 sendmsg，逐段 sendall 同样不需要拼接
+        for buf in buffers:
+            sock.sendall(buf)
+        return
+    views = [memoryview(buf).cast("B") for buf in buffers]
+    while views:
+        sent = sock.sendmsg(views)
+        # sendmsg 可能只写出一部分，跳过已发送的段后继续
+        while views and sent >= len(views[0]):
+            sent -= len(views[0])
+            views.pop(0)
+        if sent:
+            views[0] = views[0][sent:]
+
+
+def fit_preview_size(width, height, max_width, max_height):
+    # 等比缩小到预览框内，不放大；未指定预览框时保持原尺寸
+    if max_width <= 0 or max_height <= 0:
+        return width, height
+    scale = min(max_width / width, max_height / height, 1.0)
+    return max(1, int(width * scale)), max(1, int(height * scale))
+
+
+def load_gpu_jpeg_encoder():
+    # nvJPEG 编码需要 CUDA 版 PyTorch 和 torchvision>=0.19，导入较慢，只在需要时加载
+    try:
+        import torch
+        from torchvision.io import encode_jpeg
+    except ImportError:
+        return None
+    except Exception as e:
+        # 安装损坏时常见 DLL 加载失败 (OSError) 或 RuntimeError，回退到 CPU 编码
+        print(f"Load GPU JPEG encoder failed: {e}")
+        return None
+    try:
+        if not torch.cuda.is_available():
+            return None
+    except Exception as e:
+        print(f"Load GPU JPEG encoder failed: {e}")
+        return None
+    return torch, encode_jpeg
+
+
+def create_jpeg_encoder():
+    # PyTurboJPEG 需要系统中的 libturbojpeg (Windows: turbojpeg.dll, Linux: libturbojpeg0)
+    if TurboJPEG is None:
+        return None
+    try:
+        return TurboJPEG()
+    except (OSError, RuntimeError):
+        return None
+
+
+def encode_config(data):
+    # 有 orjson 时用 C 实现序列化，否则回退标准库 json；两者输出都是 UTF-8 JSON
+    if orjson is not None:
+        return orjson.dumps(data, option=orjson.OPT_INDENT_2)
+    return json.dumps(data, ensure_ascii=False, indent=4).encode("utf-8")
+
+
+def decode_config(raw):
+    if orjson is not None:
+        return orjson.loads(raw)
+    return json.loads(raw.decode("utf-8"))
+
+
 def get_logo_icon():
     icon_path = Path(__file__).resolve().parent / "logo.ico"
     if icon_path.exists():
@@ -162,60 +583,136 @@ def set_windows_app_user_model_id(app_id):
     except Exception:
         pass
 
+
+def set_windows_timer_resolution(enabled):
+    if os.name != "nt":
+        return False
+    try:
+        winmm = ctypes.WinDLL("winmm")
+        if enabled:
+            return winmm.timeBeginPeriod(1) == 0
+        winmm.timeEndPeriod(1)
+        return True
+    except Exception:
+        return False
+
 # ===========================
 # 2. 支持换肤的自定义控件
 # ===========================
+def build_button_qss(bg, hover, text):
+    return f"""
+            QPushButton {{ background-color: {bg}; color: {text}; border-radius: 8px; padding: 8px 15px; font-weight: bold; font-size: 13px; border: none; }}
+            QPushButton:hover {{ background-color: {hover}; }}
+        """
+
+
+def build_window_styles(is_dark):
+    # 主窗口各部件的样式表，导入时按深色/浅色各生成一次
+    if is_dark:
+        bg_main = "#1C1C1E"
+        bg_preview = "#000000"
+        text_color = "#E5E5E5"
+        border_color = "#333333"
+        close_bg = "#FF453A"
+        combo_bg = "#3A3A3C"
+        combo_border = "#48484A"
+    else:
+        bg_main = "#F2F2F7" # macOS 浅灰背景
+        bg_preview = "#E5E5EA" # 预览框更浅一点
+        text_color = "#1C1C1E"
+        border_color = "#D1D1D6"
+        close_bg = "#FF3B30"
+        combo_bg = "#FFFFFF"
+        combo_border = "#D1D1D6"
+
+    return {
+        "main": f"""
+            #MainFrame {{
+                background-color: {bg_main};
+                border-radius: 16px;
+                border: 1px solid {border_color};
+            }}
+            QLabel {{ color: {text_color}; font-family: 'Segoe UI', sans-serif; }}
+        """,
+        "preview": f"""
+            #PreviewFrame {{
+                background-color: {bg_preview};
+                border-radius: 12px;
+                border: 1px solid {border_color};
+            }}
+        """,
+        "close": f"""
+            QPushButton {{ background-color: {close_bg}; border-radius: 12px; color: white; font-weight: bold; }}
+            QPushButton:hover {{ background-color: red; }}
+        """,
+        "combo": f"""
+            QComboBox {{ background-color: {combo_bg}; color: {text_color}; border-radius: 8px; padding: 5px; border: 1px solid {combo_border}; }}
+            QComboBox::drop-down {{ border: none; }}
+            QComboBox QAbstractItemView {{ background-color: {combo_bg}; color: {text_color}; selection-background-color: #0A84FF; }}
+        """,
+        "title": f"font-size: 16px; font-weight: bold; color: {text_color};",
+    }
+
+
+WINDOW_STYLES = {True: build_window_styles(True), False: build_window_styles(False)}
+
+STOP_BUTTON_QSS = """
+            QPushButton { background-color: #FF453A; color: white; border-radius: 8px; border: none; font-weight: bold; font-size: 13px; }
+            QPushButton:hover { background-color: #FF5D55; }
+        """
+
 class ModernInput(QLineEdit):
-    def update_theme(self, is_dark):
-        if is_dark:
-            self.setStyleSheet("""
+    STYLES = {
+        True: """
                 QLineEdit { background-color: #3A3A3C; border: 1px solid #48484A; border-radius: 8px; color: white; padding: 5px 10px; font-size: 13px; }
                 QLineEdit:focus { border: 1px solid #0A84FF; background-color: #48484A; }
-            """)
-        else:
-            self.setStyleSheet("""
+            """,
+        False: """
                 QLineEdit { background-color: #FFFFFF; border: 1px solid #D1D1D6; border-radius: 8px; color: black; padding: 5px 10px; font-size: 13px; }
                 QLineEdit:focus { border: 1px solid #007AFF; background-color: #F2F2F7; }
-            """)
+            """,
+    }
+
+    def update_theme(self, is_dark):
+        self.setStyleSheet(self.STYLES[is_dark])
 
 class ModernButton(QPushButton):
+    # 按钮颜色逻辑：主要按钮始终是蓝色，次要按钮随主题变。键为 (is_primary, is_dark)
+    STYLES = {
+        (True, True): build_button_qss("#0A84FF", "#409CFF", "white"),
+        (True, False): build_button_qss("#0A84FF", "#409CFF", "white"),
+        (False, True): build_button_qss("#3A3A3C", "#48484A", "white"),
+        (False, False): build_button_qss("#E5E5EA", "#D1D1D6", "black"),
+    }
+
     def __init__(self, text, is_primary=False, parent=None):
         super().__init__(text, parent)
         self.is_primary = is_primary
 
     def update_theme(self, is_dark):
-        # 按钮颜色逻辑：主要按钮始终是蓝色，次要按钮随主题变
-        if self.is_primary:
-            bg, hover, text = ("#0A84FF", "#409CFF", "white")
-        else:
-            bg = "#3A3A3C" if is_dark else "#E5E5EA"
-            hover = "#48484A" if is_dark else "#D1D1D6"
-            text = "white" if is_dark else "black"
-
-        self.setStyleSheet(f"""
-            QPushButton {{ background-color: {bg}; color: {text}; border-radius: 8px; padding: 8px 15px; font-weight: bold; font-size: 13px; border: none; }}
-            QPushButton:hover {{ background-color: {hover}; }}
-        """)
+        self.setStyleSheet(self.STYLES[(self.is_primary, is_dark)])
 
 class ThemeToggleButton(QPushButton):
+    STYLES = {
+        # 深色模式下的按钮样式 (浅黄光晕)
+        True: """
+                QPushButton { background-color: rgba(255,255,255,0.1); color: #FFD60A; border-radius: 15px; font-size: 18px; border: 1px solid #48484A; }
+                QPushButton:hover { background-color: rgba(255,255,255,0.2); }
+            """,
+        # 浅色模式下的按钮样式 (深灰图标)
+        False: """
+                QPushButton { background-color: #FFFFFF; color: #FF9500; border-radius: 15px; font-size: 18px; border: 1px solid #D1D1D6; }
+                QPushButton:hover { background-color: #F2F2F7; }
+            """,
+    }
+
     def __init__(self, parent=None):
         super().__init__("☀", parent) # 默认太阳图标
         self.setFixedSize(30, 30)
         self.setCursor(Qt.CursorShape.PointingHandCursor)
     
     def update_theme(self, is_dark):
-        if is_dark:
-            # 深色模式下的按钮样式 (浅黄光晕)
-            self.setStyleSheet("""
-                QPushButton { background-color: rgba(255,255,255,0.1); color: #FFD60A; border-radius: 15px; font-size: 18px; border: 1px solid #48484A; }
-                QPushButton:hover { background-color: rgba(255,255,255,0.2); }
-            """)
-        else:
-            # 浅色模式下的按钮样式 (深灰图标)
-            self.setStyleSheet("""
-                QPushButton { background-color: #FFFFFF; color: #FF9500; border-radius: 15px; font-size: 18px; border: 1px solid #D1D1D6; }
-                QPushButton:hover { background-color: #F2F2F7; }
-            """)
+        self.setStyleSheet(self.STYLES[is_dark])
 
 # ===========================
 # 3. 主窗口 (核心逻辑)
@@ -242,7 +739,7 @@ class ModernStreamerApp(QMainWindow):
         self.auto_save_timer.setInterval(500)
         self.auto_save_timer.timeout.connect(self.save_config)
         self.worker = StreamWorker()
-        self.worker.frame_captured.connect(self.update_preview)
+        self.worker.frame_captured.connect(self.update_preview, Qt.ConnectionType.QueuedConnection)
         self.worker.fps_updated.connect(self.update_fps)
         self.worker.status_updated.connect(self.update_status)
         self.worker.finished.connect(self.on_worker_finished)
@@ -441,8 +938,7 @@ class ModernStreamerApp(QMainWindow):
             return
 
         try:
-            with self.config_path.open("r", encoding="utf-8") as f:
-                config = json.load(f)
+            config = decode_config(self.config_path.read_bytes())
         except Exception as e:
             print(f"Load config failed: {e}")
             return
@@ -478,8 +974,10 @@ class ModernStreamerApp(QMainWindow):
 
         try:
             self.ensure_config_directory()
-            with self.config_path.open("w", encoding="utf-8") as f:
-                json.dump(self.get_config_data(), f, ensure_ascii=False, indent=4)
+            # 先写临时文件再原子替换，写入中途退出也不会留下损坏的配置
+            tmp_path = self.config_path.with_suffix(".tmp")
+            tmp_path.write_bytes(encode_config(self.get_config_data()))
+            os.replace(tmp_path, self.config_path)
         except Exception as e:
             print(f"Save config failed: {e}")
 
@@ -508,57 +1006,15 @@ class ModernStreamerApp(QMainWindow):
         self.schedule_auto_save()
 
     def apply_theme(self):
-        # 1. 颜色变量定义
-        if self.is_dark_mode:
-            bg_main = "#1C1C1E"
-            bg_preview = "#000000"
-            text_color = "#E5E5E5"
-            border_color = "#333333"
-            close_bg = "#FF453A"
-            combo_bg = "#3A3A3C"
-            combo_border = "#48484A"
-        else:
-            bg_main = "#F2F2F7" # macOS 浅灰背景
-            bg_preview = "#E5E5EA" # 预览框更浅一点
-            text_color = "#1C1C1E"
-            border_color = "#D1D1D6"
-            close_bg = "#FF3B30"
-            combo_bg = "#FFFFFF"
-            combo_border = "#D1D1D6"
-
-        # 2. 设置主窗口样式
-        self.main_widget.setStyleSheet(f"""
-            #MainFrame {{
-                background-color: {bg_main};
-                border-radius: 16px;
-                border: 1px solid {border_color};
-            }}
-            QLabel {{ color: {text_color}; font-family: 'Segoe UI', sans-serif; }}
-        """)
+        # 样式表在导入时已按主题预先生成，这里只做查表赋值
+        styles = WINDOW_STYLES[self.is_dark_mode]
+        self.main_widget.setStyleSheet(styles["main"])
+        self.preview_container.setStyleSheet(styles["preview"])
+        self.btn_close.setStyleSheet(styles["close"])
+        self.proto_combo.setStyleSheet(styles["combo"])
+        self.title_lbl.setStyleSheet(styles["title"])
         
-        self.preview_container.setStyleSheet(f"""
-            #PreviewFrame {{
-                background-color: {bg_preview};
-                border-radius: 12px;
-                border: 1px solid {border_color};
-            }}
-        """)
-
-        # 3. 设置通用控件样式
-        self.btn_close.setStyleSheet(f"""
-            QPushButton {{ background-color: {close_bg}; border-radius: 12px; color: white; font-weight: bold; }}
-            QPushButton:hover {{ background-color: red; }}
-        """)
-
-        self.proto_combo.setStyleSheet(f"""
-            QComboBox {{ background-color: {combo_bg}; color: {text_color}; border-radius: 8px; padding: 5px; border: 1px solid {combo_border}; }}
-            QComboBox::drop-down {{ border: none; }}
-            QComboBox QAbstractItemView {{ background-color: {combo_bg}; color: {text_color}; selection-background-color: #0A84FF; }}
-        """)
-
-        self.title_lbl.setStyleSheet(f"font-size: 16px; font-weight: bold; color: {text_color};")
-        
-        # 4. 更新自定义控件
+        # 更新自定义控件
         for widget in self.theme_widgets:
             if hasattr(widget, 'update_theme'):
                 widget.update_theme(self.is_dark_mode)
@@ -572,10 +1028,7 @@ class ModernStreamerApp(QMainWindow):
             widget.setEnabled(enabled)
 
     def apply_stop_button_style(self):
-        self.btn_action.setStyleSheet("""
-            QPushButton { background-color: #FF453A; color: white; border-radius: 8px; border: none; font-weight: bold; font-size: 13px; }
-            QPushButton:hover { background-color: #FF5D55; }
-        """)
+        self.btn_action.setStyleSheet(STOP_BUTTON_QSS)
 
     def collect_stream_settings(self):
         ip = self.inp_ip.text().strip()
@@ -627,6 +1080,8 @@ class ModernStreamerApp(QMainWindow):
             self.worker.quality = settings["quality"]
             self.worker.fps_limit = settings["fps_limit"]
             self.worker.protocol = settings["protocol"]
+            self.worker.preview_width = self.lbl_preview.width()
+            self.worker.preview_height = self.lbl_preview.height()
             self.save_config()
 
             self.worker.start()
@@ -648,9 +1103,21 @@ class ModernStreamerApp(QMainWindow):
         self.lbl_preview.setPixmap(QPixmap())
 
     def update_preview(self, qt_img):
-        pixmap = QPixmap.fromImage(qt_img)
-        scaled_pixmap = pixmap.scaled(self.lbl_preview.size(), Qt.AspectRatioMode.KeepAspectRatio, Qt.TransformationMode.SmoothTransformation)
-        self.lbl_preview.setPixmap(scaled_pixmap)
+        # 工作线程已按预览框尺寸缩小，这里无需再缩放。qt_img 与工作线程共用缓冲区，
+        # RGB32 的 fromImage 会直接引用该缓冲区，必须持锁先复制一份再转换，
+        # 否则标签重绘时读到的是工作线程正在改写的数据；
+        # 尺寸与当前缓冲区不符说明是上一次推流遗留的帧，直接丢弃
+        lock = self.worker.preview_lock
+        lock.lock()
+        try:
+            pixmap = None
+            if qt_img.size() == self.worker.preview_image.size():
+                pixmap = QPixmap.fromImage(qt_img.copy())
+        finally:
+            lock.unlock()
+            self.worker.preview_in_flight = False
+        if pixmap is not None:
+            self.lbl_preview.setPixmap(pixmap)
 
     def update_fps(self, fps):
         self.fps_lbl.setText(f"FPS: {fps}")
@@ -684,6 +1151,7 @@ class ModernStreamerApp(QMainWindow):
         if self.worker.isRunning():
             self.worker.request_stop()
             self.worker.wait(1500)
+        self.worker.shutdown()
         super().closeEvent(event)
 
 if __name__ == "__main__":
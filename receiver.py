@@ -11,6 +11,40 @@ from pathlib import Path
 import cv2
 import numpy as np
 
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    from turbojpeg import TurboJPEG, TJPF_BGRX
+except ImportError:
+    TurboJPEG = None
+
+NS_PER_SEC = 1_000_000_000
+# TCP 帧头: 4 字节大端帧长度
+FRAME_HEADER = struct.Struct(">L")
+# TCP 接收缓冲区初始大小，单帧超过时按需扩容
+RECV_BUFFER_BYTES = 1024 * 1024
+# 内核接收缓冲区，容纳界面卡顿时的突发帧
+SOCKET_RECV_BUFFER_BYTES = 8 * 1024 * 1024
+# UDP 单个数据报上限
+UDP_MAX_DATAGRAM = 65535
+# cv2.imdecode 的降采样读取标志，JPEG 在 IDCT 阶段直接缩小
+CV2_REDUCED_FLAGS = {
+    2: cv2.IMREAD_REDUCED_COLOR_2,
+    4: cv2.IMREAD_REDUCED_COLOR_4,
+    8: cv2.IMREAD_REDUCED_COLOR_8,
+}
+CV2_SCALING_FACTORS = tuple((1, denom) for denom in CV2_REDUCED_FLAGS)
+# JPEG 起止标记，以及一个合法 JPEG 最少需要的字节数 (各必需段的头部之和)
+JPEG_SOI = b"\xff\xd8"
+JPEG_EOI = b"\xff\xd9"
+MIN_JPEG_BYTES = 125
+PNG_SIGNATURE = b"\x89PNG\r\n\x1a\n"
+# 压缩后达到此大小的帧才走 GPU 解码 (约 720p 以上)，小帧的 CUDA 调用开销划不来
+GPU_DECODE_MIN_BYTES = 128 * 1024
+
 from PyQt6.QtWidgets import (
     QApplication,
     QMainWindow,
@@ -24,12 +58,44 @@ from PyQt6.QtWidgets import (
     QFrame,
     QGraphicsDropShadowEffect,
 )
-from PyQt6.QtCore import Qt, QObject, pyqtSignal, QTimer
+from PyQt6.QtCore import Qt, QObject, pyqtSignal, QTimer, QRunnable, QThreadPool
 from PyQt6.QtGui import QImage, QPixmap, QColor, QIcon
 
 
 class ReceiverWorker(QObject):
-    frame_received = pyqtSignal(QImage)
+    # 收流线程每帧都要访问的字段，用 slots 省去实例字典查找
+    __slots__ = (
+        "is_running",
+        "bind_ip",
+        "port",
+        "protocol",
+        "preview_width",
+        "preview_height",
+        "timeout_sec",
+        "_fps_limit",
+        "_emit_interval_ns",
+        "max_frame_bytes",
+        "_last_emit_time",
+        "_last_decode_warn_time",
+        "_turbo",
+        "_gpu_jpeg",
+        "_rgb_buf",
+        "_frame_bufs",
+        "_frame_busy",
+        "_next_slot",
+        "_pending_frame",
+        "_frame_lock",
+        "_pending_data",
+        "_decode_cond",
+        "_decode_thread",
+        "_src_size",
+        "_last_status",
+        "_last_source",
+        "_last_fps",
+        "_thread",
+        "_thread_lock",
+    )
+
     fps_updated = pyqtSignal(int)
     status_updated = pyqtSignal(str)
     source_updated = pyqtSignal(str)
@@ -44,11 +110,34 @@ class ReceiverWorker(QObject):
         self.preview_width = 0
         self.preview_height = 0
         self.timeout_sec = 3
+        self._emit_interval_ns = 0
         self.fps_limit = 120
 
         self.max_frame_bytes = 20 * 1024 * 1024
-        self._last_emit_time = 0.0
-        self._last_decode_warn_time = 0.0
+        self._last_emit_time = 0
+        self._last_decode_warn_time = 0
+        self._turbo = None
+        self._gpu_jpeg = None
+        # TurboJPEG 需要二次 resize 时的中间缓冲区
+        self._rgb_buf = None
+        # 两块交替使用的输出缓冲区，QImage 直接引用它们而不复制；
+        # 槽位在界面线程 release_frame 之前不会被覆盖或重新分配
+        self._frame_bufs = [None, None]
+        self._frame_busy = [False, False]
+        self._next_slot = 0
+        # 最新一帧 (QImage, 槽位)，界面线程按屏幕刷新率取走，未取走时被新帧顶替
+        self._pending_frame = None
+        self._frame_lock = threading.Lock()
+        # 收流线程交给解码线程的最新一帧 (数据, 时间戳)，解码跟不上时被新帧顶替
+        self._pending_data = None
+        self._decode_cond = threading.Condition()
+        self._decode_thread = None
+        # cv2 路径上一帧的原始尺寸，用于选择降采样读取标志
+        self._src_size = None
+        # 上次发出的状态/来源/FPS，只在变化时才发信号
+        self._last_status = None
+        self._last_source = None
+        self._last_fps = None
         self._thread = None
         self._thread_lock = threading.Lock()
 
@@ -78,69 +167,291 @@ class ReceiverWorker(QObject):
     def request_stop(self):
         self.is_running = False
 
+    def release_frame(self, slot):
+        self._frame_busy[slot] = False
+
+    def take_frame(self):
+        with self._frame_lock:
+            frame = self._pending_frame
+            self._pending_frame = None
+        return frame
+
+    def _publish_frame(self, qt_img, slot):
+        with self._frame_lock:
+            replaced = self._pending_frame
+            self._pending_frame = (qt_img, slot)
+        if replaced is not None:
+            # 被顶替的帧没有交给界面，缓冲区直接归还
+            self._frame_busy[replaced[1]] = False
+
     def run(self):
         self.is_running = True
-        self._last_emit_time = 0.0
-        self._last_decode_warn_time = 0.0
+        self._last_emit_time = 0
+        self._last_decode_warn_time = 0
+        self._src_size = None
+        # 界面在启动时会改写状态栏，缓存清空后首条状态一定会发出
+        self._last_status = None
+        self._last_source = None
+        self._last_fps = None
+        self._pending_data = None
         try:
+            # 解码器在 try 内加载，加载异常也会走到下面的收尾逻辑并发出 finished
+            if self._turbo is None:
+                self._turbo = create_jpeg_decoder()
+            if self._gpu_jpeg is None:
+                self._gpu_jpeg = load_gpu_jpeg_decoder() or False
+            # 收流线程只做收包和分帧，解码与 FPS 统计放到独立线程，
+            # 解码耗时不会再拖慢 recv，内核缓冲区也就不容易积压
+            self._decode_thread = threading.Thread(
+                target=self._decode_loop,
+                name="ReceiverDecodeThread",
+                daemon=True,
+            )
+            self._decode_thread.start()
             if self.protocol == "TCP":
                 self._run_tcp()
             else:
                 self._run_udp()
         except Exception as e:
-            self.status_updated.emit(f"错误: {str(e)}")
+            self._emit_status(f"错误: {str(e)}")
         finally:
             self.is_running = False
-            self.fps_updated.emit(0)
-            self.source_updated.emit("None")
-            self.status_updated.emit("Stopped")
+            if self._decode_thread is not None:
+                with self._decode_cond:
+                    self._decode_cond.notify()
+                self._decode_thread.join()
+                self._decode_thread = None
+            self._pending_data = None
+            self._emit_fps(0)
+            self._emit_source("None")
+            self._emit_status("Stopped")
             with self._thread_lock:
                 self._thread = None
             self.finished.emit()
 
+    def _submit_frame(self, data, now):
+        # 收包缓冲区会被复用，交给解码线程前先复制出来
+        item = (bytes(data), now)
+        with self._decode_cond:
+            self._pending_data = item
+            self._decode_cond.notify()
+
+    def _decode_loop(self):
+        cond = self._decode_cond
+        decode_frame = self._decode_frame
+        publish_frame = self._publish_frame
+        monotonic_ns = time.monotonic_ns
+        fps_counter = 0
+        last_fps_time = monotonic_ns()
+        try:
+            while self.is_running:
+                with cond:
+                    if self._pending_data is None:
+                        cond.wait(0.5)
+                    item = self._pending_data
+                    self._pending_data = None
+
+                if item is not None:
+                    decoded = decode_frame(*item)
+                    if decoded is not None:
+                        publish_frame(*decoded)
+                        fps_counter += 1
+
+                now = monotonic_ns()
+                if now - last_fps_time >= NS_PER_SEC:
+                    self._emit_fps(fps_counter)
+                    fps_counter = 0
+                    last_fps_time = now
+        except Exception as e:
+            self._emit_status(f"解码错误: {str(e)}")
+            self.is_running = False
+
+    @property
+    def fps_limit(self):
+        return self._fps_limit
+
+    @fps_limit.setter
+    def fps_limit(self, value):
+        # 帧间隔只在修改时换算一次，热路径上只做整数比较
+        self._fps_limit = value
+        self._emit_interval_ns = NS_PER_SEC // value if value > 0 else 0
+
+    def _emit_status(self, text):
+        if text != self._last_status:
+            self._last_status = text
+            self.status_updated.emit(text)
+
+    def _emit_source(self, text):
+        if text != self._last_source:
+            self._last_source = text
+            self.source_updated.emit(text)
+
+    def _emit_fps(self, fps):
+        if fps != self._last_fps:
+            self._last_fps = fps
+            self.fps_updated.emit(fps)
+
     def _should_emit_frame(self, now):
-        if self.fps_limit <= 0:
-            return True
-        interval = 1.0 / self.fps_limit
-        if now - self._last_emit_time < interval:
+        if now - self._last_emit_time < self._emit_interval_ns:
             return False
         self._last_emit_time = now
         return True
 
-    def _warn_decode_once_per_sec(self, text):
-        now = time.time()
-        if now - self._last_decode_warn_time >= 1.0:
-            self.status_updated.emit(text)
+    def _warn_decode_once_per_sec(self, text, now):
+        if now - self._last_decode_warn_time >= NS_PER_SEC:
+            self._emit_status(text)
             self._last_decode_warn_time = now
 
-    def _decode_frame(self, data):
+    def _decode_frame(self, data, now):
         if not data:
             return None
 
         if len(data) > self.max_frame_bytes:
             self._warn_decode_once_per_sec(
-                f"帧过大({len(data)} bytes)，已丢弃。"
+                f"帧过大({len(data)} bytes)，已丢弃。", now
             )
             return None
 
-        arr = np.frombuffer(data, dtype=np.uint8)
-        frame = cv2.imdecode(arr, cv2.IMREAD_COLOR)
+        # 先用几个字节的比较挡掉错位或损坏的数据，不让解码器白跑一遍；
+        # JPEG 走 GPU/TurboJPEG 快速路径，PNG 等其它格式只交给 cv2
+        is_jpeg = data[:2] == JPEG_SOI
+        if is_jpeg:
+            if len(data) < MIN_JPEG_BYTES or data[-2:] != JPEG_EOI:
+                self._warn_decode_once_per_sec("收到不完整的 JPEG 帧，已丢弃。", now)
+                return None
+        elif data[:8] != PNG_SIGNATURE:
+            self._warn_decode_once_per_sec("收到无法识别的帧格式，已丢弃。", now)
+            return None
+
+        slot = self._next_slot
+        if self._frame_busy[slot]:
+            # 界面线程还没处理完这块缓冲区上的帧，丢弃当前帧
+            return None
+
+        if not is_jpeg:
+            frame = self._decode_cv2(data, slot)
+        elif self._gpu_jpeg and len(data) >= GPU_DECODE_MIN_BYTES:
+            frame = self._decode_gpu(data, slot)
+        elif self._turbo is not None:
+            frame = self._decode_turbo(data, slot)
+        else:
+            frame = self._decode_cv2(data, slot)
         if frame is None:
-            self._warn_decode_once_per_sec("收到无法解码的 JPEG 帧")
+            self._warn_decode_once_per_sec("收到无法解码的帧", now)
+            return None
+
+        # 所有解码路径都输出 BGRX (小端下即 0xffRRGGBB)，与 QPixmap 的内部格式一致，
+        # fromImage 时不需要再逐像素扩展
+        h, w, ch = frame.shape
+        qt_img = QImage(frame.data, w, h, ch * w, QImage.Format.Format_RGB32)
+        self._frame_busy[slot] = True
+        self._next_slot = slot ^ 1
+        return qt_img, slot
+
+    def _frame_buffer(self, slot, w, h):
+        buf = self._frame_bufs[slot]
+        if buf is None or buf.shape[0] != h or buf.shape[1] != w:
+            if self._gpu_jpeg:
+                # 页锁定内存，GPU 结果可以直接 DMA 回来
+                torch = self._gpu_jpeg[0]
+                buf = torch.empty((h, w, 4), dtype=torch.uint8, pin_memory=True).numpy()
+            else:
+                buf = np.empty((h, w, 4), dtype=np.uint8)
+            buf[:, :, 3] = 255
+            self._frame_bufs[slot] = buf
+        return buf
+
+    def _decode_gpu(self, data, slot):
+        torch, decode_jpeg, rgb_mode = self._gpu_jpeg
+        try:
+            frame = decode_jpeg(
+                torch.frombuffer(data, dtype=torch.uint8), mode=rgb_mode, device="cuda"
+            )
+        except RuntimeError:
+            return None
+
+        # 只在宽高比变化时于 GPU 上缩放，转 BGR 也在 GPU 上完成，只把最终结果拷回内存
+        _, h, w = frame.shape
+        if self._needs_resize(w, h):
+            w, h = self.preview_width, self.preview_height
+            frame = torch.nn.functional.interpolate(
+                frame[None].float(), size=(h, w), mode="area"
+            )[0].round_().to(torch.uint8)
+
+        buf = self._frame_buffer(slot, w, h)
+        # X 通道在分配缓冲区时已填 255
+        torch.from_numpy(buf)[:, :, :3].copy_(frame.flip(0).permute(1, 2, 0))
+        return buf
+
+    def _decode_turbo(self, data, slot):
+        turbo = self._turbo
+        target_w, target_h = self.preview_width, self.preview_height
+        try:
+            src_w, src_h, _, _ = turbo.decode_header(data)
+            scaling, out_w, out_h = None, src_w, src_h
+            if target_w > 0 and target_h > 0:
+                # 尽量让 IDCT 顺带完成缩小
+                scaling, out_w, out_h = pick_scaling_factor(
+                    turbo.scaling_factors, src_w, src_h, target_w, target_h
+                )
+            resize = self._needs_resize(out_w, out_h)
+            if resize:
+                buf = self._rgb_buf
+                if buf is None or buf.shape[0] != out_h or buf.shape[1] != out_w:
+                    buf = np.empty((out_h, out_w, 4), dtype=np.uint8)
+                    self._rgb_buf = buf
+            else:
+                buf = self._frame_buffer(slot, out_w, out_h)
+            # 直接输出 BGRX，省掉单独的颜色转换 (X 由 libjpeg-turbo 填 0xFF)
+            frame = turbo.decode(
+                data, pixel_format=TJPF_BGRX, scaling_factor=scaling, dst=buf
+            )
+        except (OSError, ValueError):
             return None
 
-        if self.preview_width > 0 and self.preview_height > 0:
+        if resize:
             frame = cv2.resize(
                 frame,
-                (self.preview_width, self.preview_height),
+                (target_w, target_h),
+                dst=self._frame_buffer(slot, target_w, target_h),
                 interpolation=cv2.INTER_AREA,
             )
+        return frame
+
+    def _decode_cv2(self, data, slot):
+        arr = np.frombuffer(data, dtype=np.uint8)
+        target_w, target_h = self.preview_width, self.preview_height
+        denom = 1
+        if target_w > 0 and target_h > 0 and self._src_size is not None:
+            # 流的分辨率通常不变，按上一帧尺寸选择降采样读取
+            scaling, _, _ = pick_scaling_factor(
+                CV2_SCALING_FACTORS, *self._src_size, target_w, target_h
+            )
+            if scaling is not None:
+                denom = scaling[1]
+        if denom > 1:
+            frame = cv2.imdecode(arr, CV2_REDUCED_FLAGS[denom])
+        else:
+            frame = cv2.imdecode(arr, cv2.IMREAD_COLOR)
+        if frame is None:
+            return None
+
+        h, w = frame.shape[:2]
+        self._src_size = (w * denom, h * denom)
+        if self._needs_resize(w, h):
+            w, h = target_w, target_h
+            frame = cv2.resize(frame, (w, h), interpolation=cv2.INTER_AREA)
+        return cv2.cvtColor(
+            frame, cv2.COLOR_BGR2BGRA, dst=self._frame_buffer(slot, w, h)
+        )
 
-        frame_rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-        h, w, ch = frame_rgb.shape
-        return QImage(
-            frame_rgb.data, w, h, ch * w, QImage.Format.Format_RGB888
-        ).copy()
+    def _needs_resize(self, w, h):
+        # 宽高比与预览尺寸一致时，剩余的缩放交给界面线程的 scaled() 一次完成，
+        # 只有需要改变宽高比时才在工作线程 resize
+        target_w, target_h = self.preview_width, self.preview_height
+        if target_w <= 0 or target_h <= 0:
+            return False
+        return not same_aspect_ratio(w, h, target_w, target_h)
 
     def _bind_socket(self, sock):
         try:
@@ -148,7 +459,7 @@ class ReceiverWorker(QObject):
             return self.bind_ip
         except OSError as e:
             if self.bind_ip != "0.0.0.0":
-                self.status_updated.emit(
+                self._emit_status(
                     f"绑定 {self.bind_ip}:{self.port} 失败({e})，已回退到 0.0.0.0"
                 )
                 sock.bind(("0.0.0.0", self.port))
@@ -158,14 +469,24 @@ class ReceiverWorker(QObject):
     def _run_tcp(self):
         server_sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
         server_sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        # 在 listen 之前设置，accept 出的连接继承该值并据此协商窗口缩放
+        server_sock.setsockopt(
+            socket.SOL_SOCKET, socket.SO_RCVBUF, SOCKET_RECV_BUFFER_BYTES
+        )
         server_sock.settimeout(1.0)
         try:
             bound_ip = self._bind_socket(server_sock)
             server_sock.listen(1)
-            self.status_updated.emit(
+            self._emit_status(
                 f"TCP 监听中 -> {bound_ip}:{self.port}"
             )
-            self.source_updated.emit("None")
+            self._emit_source("None")
+
+            # 热路径上用到的方法提前绑定为局部变量
+            monotonic_ns = time.monotonic_ns
+            should_emit = self._should_emit_frame
+            submit_frame = self._submit_frame
+            max_frame_bytes = self.max_frame_bytes
 
             while self.is_running:
                 try:
@@ -174,191 +495,316 @@ class ReceiverWorker(QObject):
                     continue
 
                 client_ip, client_port = client_addr
-                self.status_updated.emit(
+                self._emit_status(
                     f"TCP 已连接 <- {client_ip}:{client_port}"
                 )
-                self.source_updated.emit(f"{client_ip}:{client_port}")
+                self._emit_source(f"{client_ip}:{client_port}")
                 client_sock.settimeout(float(self.timeout_sec))
+                client_sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
 
-                fps_counter = 0
-                last_fps_time = time.time()
-                self._last_emit_time = 0.0
+                self._last_emit_time = 0
+                recv_into = client_sock.recv_into
 
                 with client_sock:
-                    buffer = bytearray()
+                    # 数据直接收进复用的缓冲区，[read_pos, write_pos) 为未消费部分，
+                    # need 为解析下一步所需的字节数 (帧头或完整帧)
+                    buf = bytearray(RECV_BUFFER_BYTES)
+                    view = memoryview(buf)
+                    read_pos = 0
+                    write_pos = 0
+                    need = 4
                     while self.is_running:
                         try:
-                            chunk = client_sock.recv(65536)
+                            received = recv_into(view[write_pos:])
                         except socket.timeout:
-                            now = time.time()
-                            if now - last_fps_time >= 1.0:
-                                self.fps_updated.emit(fps_counter)
-                                fps_counter = 0
-                                last_fps_time = now
                             continue
                         except OSError:
-                            self.status_updated.emit("TCP 客户端连接异常断开")
+                            self._emit_status("TCP 客户端连接异常断开")
                             break
 
-                        if not chunk:
-                            self.status_updated.emit("TCP 客户端已断开，等待重连...")
+                        if not received:
+                            self._emit_status("TCP 客户端已断开，等待重连...")
                             break
 
-                        buffer.extend(chunk)
-                        invalid_frame = False
-
-                        while self.is_running and len(buffer) >= 4:
-                            frame_len = struct.unpack(">L", buffer[:4])[0]
-                            if frame_len <= 0 or frame_len > self.max_frame_bytes:
-                                self.status_updated.emit(
-                                    f"收到非法帧长度: {frame_len} bytes，已断开当前连接"
-                                )
-                                buffer.clear()
-                                invalid_frame = True
-                                break
-
-                            if len(buffer) < 4 + frame_len:
-                                break
-
-                            frame_data = bytes(buffer[4:4 + frame_len])
-                            del buffer[:4 + frame_len]
-
-                            now = time.time()
-                            if not self._should_emit_frame(now):
-                                continue
-
-                            qt_img = self._decode_frame(frame_data)
-                            if qt_img is None:
-                                continue
-
-                            self.frame_received.emit(qt_img)
-                            fps_counter += 1
-
-                            if now - last_fps_time >= 1.0:
-                                self.fps_updated.emit(fps_counter)
-                                fps_counter = 0
-                                last_fps_time = now
-
-                        if invalid_frame:
+                        write_pos += received
+                        try:
+                            read_pos, need, last_frame = scan_frames(
+                                buf, read_pos, write_pos, max_frame_bytes
+                            )
+                        except ValueError as e:
+                            self._emit_status(
+                                f"收到非法帧长度: {e.args[0]} bytes，已断开当前连接"
+                            )
                             break
 
-                self.fps_updated.emit(0)
-                self.source_updated.emit("None")
+                        if last_frame is not None:
+                            now = monotonic_ns()
+                            if should_emit(now):
+                                start, length = last_frame
+                                submit_frame(view[start:start + length], now)
+
+                        if read_pos == write_pos:
+                            read_pos = write_pos = 0
+                        elif read_pos + need > len(buf):
+                            buf = compact_recv_buffer(buf, read_pos, write_pos, need)
+                            view = memoryview(buf)
+                            write_pos -= read_pos
+                            read_pos = 0
+
+                self._emit_source("None")
         finally:
             server_sock.close()
 
     def _run_udp(self):
         udp_sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
         udp_sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        udp_sock.setsockopt(
+            socket.SOL_SOCKET, socket.SO_RCVBUF, SOCKET_RECV_BUFFER_BYTES
+        )
         udp_sock.settimeout(1.0)
         try:
             bound_ip = self._bind_socket(udp_sock)
-            self.status_updated.emit(
+            self._emit_status(
                 f"UDP 监听中 -> {bound_ip}:{self.port}"
             )
-            self.source_updated.emit("None")
+            self._emit_source("None")
 
+            # 数据报直接收进复用的缓冲区，交给解码线程时再复制
+            view = memoryview(bytearray(UDP_MAX_DATAGRAM))
             last_sender = None
-            fps_counter = 0
-            last_fps_time = time.time()
-            self._last_emit_time = 0.0
+            monotonic_ns = time.monotonic_ns
+            recvfrom_into = udp_sock.recvfrom_into
+            should_emit = self._should_emit_frame
+            submit_frame = self._submit_frame
+            self._last_emit_time = 0
 
             while self.is_running:
                 try:
-                    data, sender = udp_sock.recvfrom(65535)
+                    size, sender = recvfrom_into(view)
                 except socket.timeout:
-                    now = time.time()
-                    if now - last_fps_time >= 1.0:
-                        self.fps_updated.emit(fps_counter)
-                        fps_counter = 0
-                        last_fps_time = now
                     continue
 
-                sender_text = f"{sender[0]}:{sender[1]}"
-                if sender_text != last_sender:
-                    last_sender = sender_text
-                    self.source_updated.emit(sender_text)
-                    self.status_updated.emit(f"UDP 收流中 <- {sender_text}")
-
-                now = time.time()
-                if not self._should_emit_frame(now):
-                    continue
+                if sender != last_sender:
+                    last_sender = sender
+                    sender_text = f"{sender[0]}:{sender[1]}"
+                    self._emit_source(sender_text)
+                    self._emit_status(f"UDP 收流中 <- {sender_text}")
 
-                qt_img = self._decode_frame(data)
-                if qt_img is None:
+                now = monotonic_ns()
+                if not should_emit(now):
                     continue
 
-                self.frame_received.emit(qt_img)
-                fps_counter += 1
-
-                if now - last_fps_time >= 1.0:
-                    self.fps_updated.emit(fps_counter)
-                    fps_counter = 0
-                    last_fps_time = now
+                # 解码线程只保留最新一帧，积压的旧帧在那里被顶替，这里不必再排空
+                submit_frame(view[:size], now)
         finally:
             udp_sock.close()
 
 
+def build_button_qss(bg, hover, text):
+    return f"""
+            QPushButton {{ background-color: {bg}; color: {text}; border-radius: 8px; padding: 8px 15px; font-weight: bold; font-size: 13px; border: none; }}
+            QPushButton:hover {{ background-color: {hover}; }}
+        """
+
+
+def build_window_styles(is_dark):
+    # 主窗口各部件的样式表，导入时按深色/浅色各生成一次
+    if is_dark:
+        bg_main = "#1C1C1E"
+        bg_preview = "#000000"
+        text_color = "#E5E5E5"
+        border_color = "#333333"
+        close_bg = "#FF453A"
+        combo_bg = "#3A3A3C"
+        combo_border = "#48484A"
+    else:
+        bg_main = "#F2F2F7"
+        bg_preview = "#E5E5EA"
+        text_color = "#1C1C1E"
+        border_color = "#D1D1D6"
+        close_bg = "#FF3B30"
+        combo_bg = "#FFFFFF"
+        combo_border = "#D1D1D6"
+
+    return {
+        "main": f"""
+            #MainFrame {{
+                background-color: {bg_main};
+                border-radius: 16px;
+                border: 1px solid {border_color};
+            }}
+            QLabel {{ color: {text_color}; font-family: 'Segoe UI', sans-serif; }}
+        """,
+        "preview": f"""
+            #PreviewFrame {{
+                background-color: {bg_preview};
+                border-radius: 12px;
+                border: 1px solid {border_color};
+            }}
+        """,
+        "close": f"""
+            QPushButton {{ background-color: {close_bg}; border-radius: 12px; color: white; font-weight: bold; }}
+            QPushButton:hover {{ background-color: red; }}
+        """,
+        "combo": f"""
+            QComboBox {{ background-color: {combo_bg}; color: {text_color}; border-radius: 8px; padding: 5px; border: 1px solid {combo_border}; }}
+            QComboBox::drop-down {{ border: none; }}
+            QComboBox QAbstractItemView {{ background-color: {combo_bg}; color: {text_color}; selection-background-color: #0A84FF; }}
+        """,
+        "title": f"font-size: 16px; font-weight: bold; color: {text_color};",
+    }
+
+
+WINDOW_STYLES = {True: build_window_styles(True), False: build_window_styles(False)}
+
+STOP_BUTTON_QSS = """
+            QPushButton { background-color: #FF453A; color: white; border-radius: 8px; border: none; font-weight: bold; font-size: 13px; }
+            QPushButton:hover { background-color: #FF5D55; }
+        """
+
+
 class ModernInput(QLineEdit):
-    def update_theme(self, is_dark):
-        if is_dark:
-            self.setStyleSheet(
-                """
+    STYLES = {
+        True: """
                 QLineEdit { background-color: #3A3A3C; border: 1px solid #48484A; border-radius: 8px; color: white; padding: 5px 10px; font-size: 13px; }
                 QLineEdit:focus { border: 1px solid #0A84FF; background-color: #48484A; }
-            """
-            )
-        else:
-            self.setStyleSheet(
-                """
+            """,
+        False: """
                 QLineEdit { background-color: #FFFFFF; border: 1px solid #D1D1D6; border-radius: 8px; color: black; padding: 5px 10px; font-size: 13px; }
                 QLineEdit:focus { border: 1px solid #007AFF; background-color: #F2F2F7; }
-            """
-            )
+            """,
+    }
+
+    def update_theme(self, is_dark):
+        self.setStyleSheet(self.STYLES[is_dark])
 
 
 class ModernButton(QPushButton):
+    # 键为 (is_primary, is_dark)，主要按钮在两种主题下都是蓝色
+    STYLES = {
+        (True, True): build_button_qss("#0A84FF", "#409CFF", "white"),
+        (True, False): build_button_qss("#0A84FF", "#409CFF", "white"),
+        (False, True): build_button_qss("#3A3A3C", "#48484A", "white"),
+        (False, False): build_button_qss("#E5E5EA", "#D1D1D6", "black"),
+    }
+
     def __init__(self, text, is_primary=False, parent=None):
         super().__init__(text, parent)
         self.is_primary = is_primary
 
     def update_theme(self, is_dark):
-        if self.is_primary:
-            bg, hover, text = ("#0A84FF", "#409CFF", "white")
-        else:
-            bg = "#3A3A3C" if is_dark else "#E5E5EA"
-            hover = "#48484A" if is_dark else "#D1D1D6"
-            text = "white" if is_dark else "black"
-
-        self.setStyleSheet(
-            f"""
-            QPushButton {{ background-color: {bg}; color: {text}; border-radius: 8px; padding: 8px 15px; font-weight: bold; font-size: 13px; border: none; }}
-            QPushButton:hover {{ background-color: {hover}; }}
-        """
-        )
+        self.setStyleSheet(self.STYLES[(self.is_primary, is_dark)])
 
 
 class ThemeToggleButton(QPushButton):
+    STYLES = {
+        True: """
+                QPushButton { background-color: rgba(255,255,255,0.1); color: #FFD60A; border-radius: 15px; font-size: 18px; border: 1px solid #48484A; }
+                QPushButton:hover { background-color: rgba(255,255,255,0.2); }
+            """,
+        False: """
+                QPushButton { background-color: #FFFFFF; color: #FF9500; border-radius: 15px; font-size: 18px; border: 1px solid #D1D1D6; }
+                QPushButton:hover { background-color: #F2F2F7; }
+            """,
+    }
+
     def __init__(self, parent=None):
         super().__init__("☀", parent)
         self.setFixedSize(30, 30)
         self.setCursor(Qt.CursorShape.PointingHandCursor)
 
     def update_theme(self, is_dark):
-        if is_dark:
-            self.setStyleSheet(
-                """
-                QPushButton { background-color: rgba(255,255,255,0.1); color: #FFD60A; border-radius: 15px; font-size: 18px; border: 1px solid #48484A; }
-                QPushButton:hover { background-color: rgba(255,255,255,0.2); }
-            """
-            )
-        else:
-            self.setStyleSheet(
-                """
-                QPushButton { background-color: #FFFFFF; color: #FF9500; border-radius: 15px; font-size: 18px; border: 1px solid #D1D1D6; }
-                QPushButton:hover { background-color: #F2F2F7; }
-            """
-            )
+        self.setStyleSheet(self.STYLES[is_dark])
+
+
+def scan_frames(buf, read_pos, write_pos, max_frame_bytes):
+    # 一次扫完缓冲区内所有完整帧，只返回最新一帧 (起点, 长度)，
+    # 同一批到达的旧帧反正会被 FPS 闸门丢掉，没必要逐帧走一遍解码流程。
+    # 返回 (新的 read_pos, 下一步所需字节数, 最新帧或 None)；帧长度非法时抛 ValueError
+    unpack_header = FRAME_HEADER.unpack_from
+    last_frame = None
+    while write_pos - read_pos >= 4:
+        frame_len = unpack_header(buf, read_pos)[0]
+        if frame_len <= 0 or frame_len > max_frame_bytes:
+            raise ValueError(frame_len)
+        if write_pos - read_pos < 4 + frame_len:
+            return read_pos, 4 + frame_len, last_frame
+        last_frame = (read_pos + 4, frame_len)
+        read_pos += 4 + frame_len
+    return read_pos, 4, last_frame
+
+
+def compact_recv_buffer(buf, read_pos, write_pos, need):
+    # 未消费数据移到缓冲区开头; 容量不足 need 时换成更大的缓冲区
+    unread = write_pos - read_pos
+    if need > len(buf):
+        new_buf = bytearray(max(need, len(buf) * 2))
+        new_buf[:unread] = memoryview(buf)[read_pos:write_pos]
+        return new_buf
+    view = memoryview(buf)
+    view[:unread] = view[read_pos:write_pos]
+    return buf
+
+
+def load_gpu_jpeg_decoder():
+    # nvJPEG 解码需要 CUDA 版 PyTorch 和 torchvision>=0.19，导入较慢，只在需要时加载
+    try:
+        import torch
+        from torchvision.io import decode_jpeg, ImageReadMode
+    except ImportError:
+        return None
+    except Exception as e:
+        # 安装损坏时常见 DLL 加载失败 (OSError) 或 RuntimeError，回退到 CPU 解码
+        print(f"Load GPU JPEG decoder failed: {e}")
+        return None
+    try:
+        if not torch.cuda.is_available():
+            return None
+    except Exception as e:
+        print(f"Load GPU JPEG decoder failed: {e}")
+        return None
+    return torch, decode_jpeg, ImageReadMode.RGB
+
+
+def create_jpeg_decoder():
+    # PyTurboJPEG 需要系统中的 libturbojpeg (Windows: turbojpeg.dll, Linux: libturbojpeg0)
+    if TurboJPEG is None:
+        return None
+    try:
+        return TurboJPEG()
+    except (OSError, RuntimeError):
+        return None
+
+
+def pick_scaling_factor(factors, src_w, src_h, dst_w, dst_h):
+    # 在 libjpeg-turbo 支持的缩放比例中，选缩放后仍不小于目标尺寸的最小一档
+    best = (None, src_w, src_h)
+    for num, denom in factors:
+        if num >= denom:
+            continue
+        scaled_w = (src_w * num + denom - 1) // denom
+        scaled_h = (src_h * num + denom - 1) // denom
+        if scaled_w >= dst_w and scaled_h >= dst_h and scaled_w < best[1]:
+            best = ((num, denom), scaled_w, scaled_h)
+    return best
+
+
+def same_aspect_ratio(w1, h1, w2, h2):
+    # 允许 1% 误差，吸收 IDCT 缩放的取整
+    return abs(w1 * h2 - w2 * h1) * 100 <= max(w1 * h2, w2 * h1)
+
+
+def encode_config(data):
+    # 有 orjson 时用 C 实现序列化，否则回退标准库 json；两者输出都是 UTF-8 JSON
+    if orjson is not None:
+        return orjson.dumps(data, option=orjson.OPT_INDENT_2)
+    return json.dumps(data, ensure_ascii=False, indent=4).encode("utf-8")
+
+
+def decode_config(raw):
+    if orjson is not None:
+        return orjson.loads(raw)
+    return json.loads(raw.decode("utf-8"))
 
 
 def get_logo_icon():
@@ -377,6 +823,23 @@ def set_windows_app_user_model_id(app_id):
         pass
 
 
+class ConfigWriter(QRunnable):
+    # 在后台线程写配置：先写临时文件再原子替换，写入中途退出也不会留下损坏的配置
+    def __init__(self, path, payload):
+        super().__init__()
+        self.path = path
+        self.payload = payload
+
+    def run(self):
+        try:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            tmp_path = self.path.with_suffix(".tmp")
+            tmp_path.write_bytes(self.payload)
+            os.replace(tmp_path, self.path)
+        except Exception as e:
+            print(f"Save config failed: {e}")
+
+
 class ModernReceiverApp(QMainWindow):
     def __init__(self):
         super().__init__()
@@ -389,19 +852,28 @@ class ModernReceiverApp(QMainWindow):
 
         self.app_name = "HX Streamer Receiver"
         self.is_dark_mode = True
+        self._applied_theme = None
         self.config_path = self.resolve_config_path()
         self.legacy_config_path = Path(__file__).resolve().parent / "receiver_config.json"
         self.ensure_config_directory()
         self.migrate_legacy_config()
 
         self.is_loading_config = False
+        # 上次写出的配置内容，拖动滑块来回变化但最终未变时不重复写盘
+        self._saved_config = None
+        # 单线程池保证多次保存按顺序落盘
+        self.save_pool = QThreadPool(self)
+        self.save_pool.setMaxThreadCount(1)
         self.auto_save_timer = QTimer(self)
         self.auto_save_timer.setSingleShot(True)
         self.auto_save_timer.setInterval(500)
         self.auto_save_timer.timeout.connect(self.save_config)
 
         self.worker = ReceiverWorker()
-        self.worker.frame_received.connect(self.update_preview)
+        # 按屏幕刷新率取最新帧，源帧率更高时多余的帧不会进入界面线程
+        self.preview_timer = QTimer(self)
+        self.preview_timer.setTimerType(Qt.TimerType.PreciseTimer)
+        self.preview_timer.timeout.connect(self.poll_preview)
         self.worker.fps_updated.connect(self.update_fps)
         self.worker.status_updated.connect(self.update_status)
         self.worker.source_updated.connect(self.update_source)
@@ -564,10 +1036,14 @@ class ModernReceiverApp(QMainWindow):
             print(f"Migrate legacy config failed: {e}")
 
     def parse_int(self, value, default, min_value=None, max_value=None):
-        try:
-            result = int(value)
-        except (TypeError, ValueError):
-            return default
+        # 配置里的数值通常已经是 int，直接使用，不走异常路径
+        if isinstance(value, int):
+            result = value
+        else:
+            try:
+                result = int(value)
+            except (TypeError, ValueError):
+                return default
         if min_value is not None and result < min_value:
             return default
         if max_value is not None and result > max_value:
@@ -591,17 +1067,24 @@ class ModernReceiverApp(QMainWindow):
             return
 
         try:
-            with self.config_path.open("r", encoding="utf-8") as f:
-                config = json.load(f)
+            config = decode_config(self.config_path.read_bytes())
         except Exception as e:
             print(f"Load config failed: {e}")
             return
+        if not isinstance(config, dict):
+            print("Load config failed: config root is not an object")
+            return
 
         self.is_loading_config = True
-        self.inp_ip.setText(str(config.get("ip", self.inp_ip.text())))
-        self.inp_port.setText(str(config.get("port", self.inp_port.text())))
-        self.inp_w.setText(str(config.get("preview_width", self.inp_w.text())))
-        self.inp_h.setText(str(config.get("preview_height", self.inp_h.text())))
+        for key, widget in (
+            ("ip", self.inp_ip),
+            ("port", self.inp_port),
+            ("preview_width", self.inp_w),
+            ("preview_height", self.inp_h),
+        ):
+            value = config.get(key)
+            if value is not None:
+                widget.setText(str(value))
 
         timeout_sec = self.parse_int(
             config.get("timeout_sec"), self.slider_timeout.value(), 1, 30
@@ -624,18 +1107,18 @@ class ModernReceiverApp(QMainWindow):
 
         self.lbl_timeout_title.setText(f"Socket Timeout: {self.slider_timeout.value()}s")
         self.lbl_fps_title.setText(f"Display FPS Limit: {self.slider_fps.value()}")
+        self._saved_config = encode_config(self.get_config_data())
         self.is_loading_config = False
 
     def save_config(self):
         if self.is_loading_config:
             return
 
-        try:
-            self.ensure_config_directory()
-            with self.config_path.open("w", encoding="utf-8") as f:
-                json.dump(self.get_config_data(), f, ensure_ascii=False, indent=4)
-        except Exception as e:
-            print(f"Save config failed: {e}")
+        payload = encode_config(self.get_config_data())
+        if payload == self._saved_config:
+            return
+        self._saved_config = payload
+        self.save_pool.start(ConfigWriter(self.config_path, payload))
 
     def schedule_auto_save(self, *_):
         if self.is_loading_config:
@@ -658,68 +1141,22 @@ class ModernReceiverApp(QMainWindow):
         self.schedule_auto_save()
 
     def apply_theme(self):
-        if self.is_dark_mode:
-            bg_main = "#1C1C1E"
-            bg_preview = "#000000"
-            text_color = "#E5E5E5"
-            border_color = "#333333"
-            close_bg = "#FF453A"
-            combo_bg = "#3A3A3C"
-            combo_border = "#48484A"
-        else:
-            bg_main = "#F2F2F7"
-            bg_preview = "#E5E5EA"
-            text_color = "#1C1C1E"
-            border_color = "#D1D1D6"
-            close_bg = "#FF3B30"
-            combo_bg = "#FFFFFF"
-            combo_border = "#D1D1D6"
-
-        self.main_widget.setStyleSheet(
-            f"""
-            #MainFrame {{
-                background-color: {bg_main};
-                border-radius: 16px;
-                border: 1px solid {border_color};
-            }}
-            QLabel {{ color: {text_color}; font-family: 'Segoe UI', sans-serif; }}
-        """
-        )
-
-        self.preview_container.setStyleSheet(
-            f"""
-            #PreviewFrame {{
-                background-color: {bg_preview};
-                border-radius: 12px;
-                border: 1px solid {border_color};
-            }}
-        """
-        )
-
-        self.btn_close.setStyleSheet(
-            f"""
-            QPushButton {{ background-color: {close_bg}; border-radius: 12px; color: white; font-weight: bold; }}
-            QPushButton:hover {{ background-color: red; }}
-        """
-        )
-
-        self.proto_combo.setStyleSheet(
-            f"""
-            QComboBox {{ background-color: {combo_bg}; color: {text_color}; border-radius: 8px; padding: 5px; border: 1px solid {combo_border}; }}
-            QComboBox::drop-down {{ border: none; }}
-            QComboBox QAbstractItemView {{ background-color: {combo_bg}; color: {text_color}; selection-background-color: #0A84FF; }}
-        """
-        )
-
-        self.title_lbl.setStyleSheet(
-            f"font-size: 16px; font-weight: bold; color: {text_color};"
-        )
-
-        for widget in self.theme_widgets:
-            if hasattr(widget, "update_theme"):
-                widget.update_theme(self.is_dark_mode)
-
-        self.btn_theme.update_theme(self.is_dark_mode)
+        # 样式表在导入时已按主题预先生成；主题没变时不重复 setStyleSheet，
+        # 避免 Qt 重新解析样式并触发重新布局
+        if self._applied_theme != self.is_dark_mode:
+            styles = WINDOW_STYLES[self.is_dark_mode]
+            self.main_widget.setStyleSheet(styles["main"])
+            self.preview_container.setStyleSheet(styles["preview"])
+            self.btn_close.setStyleSheet(styles["close"])
+            self.proto_combo.setStyleSheet(styles["combo"])
+            self.title_lbl.setStyleSheet(styles["title"])
+
+            for widget in self.theme_widgets:
+                if hasattr(widget, "update_theme"):
+                    widget.update_theme(self.is_dark_mode)
+
+            self.btn_theme.update_theme(self.is_dark_mode)
+            self._applied_theme = self.is_dark_mode
         if self.worker.isRunning():
             self.apply_stop_button_style()
 
@@ -735,12 +1172,7 @@ class ModernReceiverApp(QMainWindow):
             widget.setEnabled(enabled)
 
     def apply_stop_button_style(self):
-        self.btn_action.setStyleSheet(
-            """
-            QPushButton { background-color: #FF453A; color: white; border-radius: 8px; border: none; font-weight: bold; font-size: 13px; }
-            QPushButton:hover { background-color: #FF5D55; }
-        """
-        )
+        self.btn_action.setStyleSheet(STOP_BUTTON_QSS)
 
     def collect_settings(self):
         bind_ip = self.inp_ip.text().strip()
@@ -799,6 +1231,8 @@ class ModernReceiverApp(QMainWindow):
             self.save_config()
 
             self.worker.start()
+            refresh_rate = self.screen().refreshRate() or 60.0
+            self.preview_timer.start(max(1, int(1000 / refresh_rate)))
             self.btn_action.setText("Stop Receiving")
             self.apply_stop_button_style()
             self.set_stream_inputs_enabled(False)
@@ -810,6 +1244,10 @@ class ModernReceiverApp(QMainWindow):
             self.btn_action.setText("Stopping...")
 
     def on_worker_finished(self):
+        self.preview_timer.stop()
+        frame = self.worker.take_frame()
+        if frame is not None:
+            self.worker.release_frame(frame[1])
         self.btn_action.setEnabled(True)
         self.btn_action.setText("Start Receiving")
         self.btn_action.update_theme(self.is_dark_mode)
@@ -817,13 +1255,29 @@ class ModernReceiverApp(QMainWindow):
         self.lbl_preview.setText("Waiting For Stream")
         self.lbl_preview.setPixmap(QPixmap())
 
-    def update_preview(self, qt_img):
-        pixmap = QPixmap.fromImage(qt_img)
-        scaled_pixmap = pixmap.scaled(
-            self.lbl_preview.size(),
-            Qt.AspectRatioMode.KeepAspectRatio,
-            Qt.TransformationMode.SmoothTransformation,
-        )
+    def poll_preview(self):
+        frame = self.worker.take_frame()
+        if frame is not None:
+            self.update_preview(*frame)
+
+    def update_preview(self, qt_img, slot):
+        # RGB32 的 QPixmap 会直接共享工作线程的缓冲区，
+        # 必须在得到独立的缩放结果后才能归还槽位
+        try:
+            pixmap = QPixmap.fromImage(qt_img)
+            target_size = self.lbl_preview.size()
+            # 只有缩小时才需要平滑插值，放大用快速模式
+            if pixmap.width() > target_size.width() or pixmap.height() > target_size.height():
+                mode = Qt.TransformationMode.SmoothTransformation
+            else:
+                mode = Qt.TransformationMode.FastTransformation
+            scaled_pixmap = pixmap.scaled(
+                target_size, Qt.AspectRatioMode.KeepAspectRatio, mode
+            )
+            if scaled_pixmap.cacheKey() == pixmap.cacheKey():
+                scaled_pixmap = pixmap.copy()
+        finally:
+            self.worker.release_frame(slot)
         self.lbl_preview.setPixmap(scaled_pixmap)
 
     def update_fps(self, fps):
@@ -857,6 +1311,7 @@ class ModernReceiverApp(QMainWindow):
     def closeEvent(self, event):
         self.auto_save_timer.stop()
         self.save_config()
+        self.save_pool.waitForDone()
         if self.worker.isRunning():
             self.worker.request_stop()
             self.worker.wait(1500)
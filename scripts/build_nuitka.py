@@ -1,29 +1,76 @@
 import argparse
+import functools
+import hashlib
+import importlib.util
+import mmap
+import os
 import platform
 import shutil
+import stat
 import subprocess
 import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
 from pathlib import Path
 
+try:
+    # The stamp is not a security boundary, so any fast hash will do.
+    from blake3 import blake3 as new_stamp_hash
+except ImportError:
+    new_stamp_hash = functools.partial(hashlib.sha256, usedforsecurity=False)
+
 
 ROOT = Path(__file__).resolve().parent.parent
 LOGO_ICO = ROOT / "logo.ico"
+LOGO_ICO_EXISTS = LOGO_ICO.is_file()
 RELEASE_VERSION = "1.0.0"
+# Build caches live outside output-root, so --clean never throws them away.
+NUITKA_CACHE_DIR = ROOT / ".nuitka-cache"
+CCACHE_DIR = ROOT / ".ccache"
+ASSET_CACHE_DIR = ROOT / ".build-cache" / "assets"
+STAMP_NAME = ".build-stamp"
+# Directories that never hold app sources; pruned from the stamp walk.
+STAMP_SKIP_DIRS = {
+    ".git",
+    ".venv",
+    "venv",
+    "build",
+    "__pycache__",
+    ".nuitka-cache",
+    ".ccache",
+    ".build-cache",
+}
+# Flags that only change how fast Nuitka runs, not what it produces.
+STAMP_IGNORED_FLAGS = ("--jobs=", "--remove-output")
+# Large pipe buffer so captured Nuitka output is read in few, big chunks.
+OUTPUT_PIPE_BUFFER = 1 << 20
+# --clean on Windows: deletion threads, and retries for files held by antivirus scans.
+CLEAN_WORKERS = 8
+CLEAN_RETRIES = 5
+CLEAN_RETRY_DELAY = 0.1
+# Persistent per-version unpack dir; Nuitka fills it on first launch and reuses it.
+ONEFILE_CACHE_SPEC = "{CACHE_DIR}/{COMPANY}/{PRODUCT}/{VERSION}"
+
+# Concurrent builds write through this lock so their lines never interleave mid-line.
+output_lock = threading.Lock()
 
 APPS = {
     "sender": {
-        "entry": ROOT / "main.py",
+        "entry": str(ROOT / "main.py"),
         "binary_name": "HX_Streamer_Pro",
         "product_name": "HX Streamer Pro",
     },
     "receiver": {
-        "entry": ROOT / "receiver.py",
+        "entry": str(ROOT / "receiver.py"),
         "binary_name": "HX_Receiver_Pro",
         "product_name": "HX Streamer Receiver",
     },
 }
 
 
+@functools.lru_cache(maxsize=1)
 def detect_platform_name():
     value = platform.system().lower()
     if value.startswith("win"):
@@ -36,7 +83,7 @@ def detect_platform_name():
 
 
 def has_non_ascii(value):
-    return any(ord(ch) > 127 for ch in str(value))
+    return not str(value).isascii()
 
 
 def ensure_supported_build_path(platform_name):
@@ -51,49 +98,331 @@ def ensure_supported_build_path(platform_name):
         )
 
 
-def run_cmd(cmd):
-    print(" ".join(str(part) for part in cmd))
-    subprocess.run(cmd, check=True, cwd=ROOT)
+def write_output(data):
+    with output_lock:
+        sys.stdout.buffer.write(data)
+        sys.stdout.buffer.flush()
 
 
-def ensure_zstandard_for_onefile(mode):
-    if mode != "onefile":
+def run_cmd(cmd, env=None, quiet=False, tag=None):
+    prefix = f"[{tag}] ".encode() if tag else b""
+    write_output(prefix + " ".join(str(part) for part in cmd).encode() + b"\n")
+    if not quiet and not tag:
+        subprocess.run(cmd, check=True, cwd=ROOT, env=env)
         return
-    try:
-        __import__("zstandard")
-    except ModuleNotFoundError as exc:
+
+    with subprocess.Popen(
+        cmd,
+        cwd=ROOT,
+        env=env,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.STDOUT,
+        bufsize=OUTPUT_PIPE_BUFFER,
+    ) as proc:
+        if quiet:
+            # Collect everything and hand it to the console in one write.
+            output = proc.stdout.read()
+            if prefix:
+                output = b"".join(prefix + line for line in output.splitlines(True))
+            write_output(output)
+        else:
+            # Parallel builds: tag every line with its app to keep the log readable.
+            for line in proc.stdout:
+                write_output(prefix + line)
+    if proc.returncode:
+        raise subprocess.CalledProcessError(proc.returncode, cmd)
+
+
+def make_build_env():
+    # Pin Nuitka's own cache and the C compiler cache to the project, so
+    # rebuilds and CI runs that restore these directories mostly hit the cache.
+    env = os.environ.copy()
+    env["NUITKA_CACHE_DIR"] = str(NUITKA_CACHE_DIR)
+    env["CCACHE_DIR"] = str(CCACHE_DIR)
+    env["CCACHE_COMPRESS"] = "1"
+    env["CCACHE_MAXSIZE"] = "5G"
+    # Hash sources by content relative to the checkout, so a different
+    # workspace path (as on CI) or fresh file timestamps still hit the cache.
+    env["CCACHE_BASEDIR"] = str(ROOT)
+    env["CCACHE_SLOPPINESS"] = "pch_defines,time_macros,include_file_mtime,include_file_ctime"
+    env["CCACHE_COMPILERCHECK"] = "content"
+    return env
+
+
+def retry_remove(remove, path):
+    for attempt in range(CLEAN_RETRIES):
+        try:
+            remove(path)
+            return
+        except FileNotFoundError:
+            return
+        except PermissionError:
+            if attempt == CLEAN_RETRIES - 1:
+                raise
+            # Read-only files cannot be deleted on Windows; scanners release theirs shortly.
+            try:
+                os.chmod(path, stat.S_IWRITE)
+            except OSError:
+                pass
+            time.sleep(CLEAN_RETRY_DELAY * (2 ** attempt))
+
+
+def is_windows_dir_link(entry):
+    # Directory symlinks and NTFS junctions are removed with rmdir and never
+    # descended into. is_dir(follow_symlinks=False) is True for junctions, so
+    # check the reparse tag the same way shutil.rmtree does.
+    if os.name != "nt":
+        return False
+    if entry.is_symlink():
+        return entry.is_dir()
+    if hasattr(entry, "is_junction"):
+        return entry.is_junction()
+    st = entry.stat(follow_symlinks=False)
+    return bool(
+        st.st_file_attributes & stat.FILE_ATTRIBUTE_REPARSE_POINT
+        and st.st_reparse_tag == stat.IO_REPARSE_TAG_MOUNT_POINT
+    )
+
+
+def collect_tree(path, files, dirs):
+    dirs.append(path)
+    with os.scandir(path) as it:
+        for entry in it:
+            if is_windows_dir_link(entry):
+                dirs.append(entry.path)
+            elif entry.is_dir(follow_symlinks=False):
+                collect_tree(entry.path, files, dirs)
+            else:
+                files.append(entry.path)
+
+
+def remove_tree_parallel(path):
+    files = []
+    dirs = []
+    collect_tree(path, files, dirs)
+    # os.unlink releases the GIL, so a thread pool overlaps the per-file
+    # latency that Windows Defender adds to every delete.
+    with ThreadPoolExecutor(max_workers=CLEAN_WORKERS) as pool:
+        for _ in pool.map(lambda file_path: retry_remove(os.unlink, file_path), files):
+            pass
+    for dir_path in reversed(dirs):
+        retry_remove(os.rmdir, dir_path)
+
+
+def remove_tree(path):
+    if os.name == "nt":
+        remove_tree_parallel(path)
+    else:
+        shutil.rmtree(path)
+
+
+
+@functools.lru_cache(maxsize=None)
+def module_available(name):
+    # Locates the module without importing it, so no extension DLL gets loaded.
+    return importlib.util.find_spec(name) is not None
+
+
+def ensure_nuitka_available():
+    # Fail before spawning an interpreter that would only die on "No module named nuitka".
+    if not module_available("nuitka"):
+        raise RuntimeError(
+            "Nuitka is not installed in this environment. "
+            "Run: uv sync --group build"
+        )
+
+
+@functools.lru_cache(maxsize=1)
+def nuitka_main_script():
+    # Running the file directly skips the -m package lookup in the child;
+    # Nuitka drops its own directory from sys.path when started this way.
+    # No -I: the child must see the same sys.path (PYTHONPATH, user site) as
+    # ensure_nuitka_available, since Nuitka compiles against it.
+    spec = importlib.util.find_spec("nuitka")
+    return os.path.join(spec.submodule_search_locations[0], "__main__.py")
+
+
+def ensure_zstandard_for_onefile(mode, compress=True):
+    if mode != "onefile" or not compress:
+        return
+    if not module_available("zstandard"):
         raise RuntimeError(
             "zstandard is required for compressed onefile builds. "
             "Run: uv sync --group build"
-        ) from exc
+        )
 
 
-def build_one(app_key, output_root):
-    app = APPS[app_key]
-    platform_name = args.platform
-    mode = args.mode
-    if mode == "auto":
-        if platform_name == "windows":
-            mode = "onefile"
-        elif platform_name == "macos":
-            mode = "app"
-        else:
-            mode = "standalone"
+def iter_source_files(dirpath):
+    # scandir entries carry the file type from the directory read itself, so
+    # skipped directories and non-.py files never cost an extra stat.
+    with os.scandir(dirpath) as it:
+        entries = sorted(it, key=lambda entry: entry.name)
+    for entry in entries:
+        if entry.is_dir(follow_symlinks=False):
+            if entry.name not in STAMP_SKIP_DIRS:
+                yield from iter_source_files(entry.path)
+        elif entry.name.endswith(".py") and entry.is_file():
+            yield entry.path
 
-    ensure_zstandard_for_onefile(mode)
 
-    app_output_dir = output_root / f"{platform_name}-{args.macos_arch if platform_name == 'macos' else 'native'}" / app_key
-    app_output_dir.mkdir(parents=True, exist_ok=True)
+def iter_stamp_inputs():
+    yield from iter_source_files(ROOT)
+    # Bundled data and locked dependency versions also change the output.
+    yield str(LOGO_ICO)
+    yield os.path.join(ROOT, "uv.lock")
 
-    cmd = [
-        sys.executable,
-        "-m",
-        "nuitka",
+
+def hash_file(key, path):
+    flags = os.O_RDONLY | getattr(os, "O_BINARY", 0) | getattr(os, "O_CLOEXEC", 0)
+    try:
+        fd = os.open(path, flags)
+    except FileNotFoundError:
+        return False
+    try:
+        size = os.fstat(fd).st_size
+        if size >= mmap.PAGESIZE:
+            with mmap.mmap(fd, 0, access=mmap.ACCESS_READ) as data:
+                key.update(data)
+        elif size:
+            key.update(os.read(fd, size))
+    finally:
+        os.close(fd)
+    return True
+
+
+def compute_build_key(cmd):
+    key = new_stamp_hash()
+    key.update(
+        "\0".join(
+            str(part)
+            for part in cmd
+            if not str(part).startswith(STAMP_IGNORED_FLAGS)
+        ).encode()
+    )
+    key.update(b"\0" + RELEASE_VERSION.encode())
+    for path in iter_stamp_inputs():
+        key.update(b"\0" + os.path.relpath(path, ROOT).encode() + b"\0")
+        if not hash_file(key, path):
+            key.update(b"missing")
+    return key.hexdigest()
+
+
+@dataclass(frozen=True)
+class BuildCfg:
+    platform: str
+    mode: str
+    macos_arch: str
+    create_dmg: bool
+    onefile_cache: bool
+    onefile_compression: bool
+    keep_intermediates: bool
+    logo_path: str
+    jobs: int
+    parallel: int
+    force: bool
+    quiet: bool
+
+
+def resolve_mode(platform_name, mode):
+    if mode != "auto":
+        return mode
+    if platform_name == "windows":
+        return "onefile"
+    if platform_name == "macos":
+        return "app"
+    return "standalone"
+
+
+def stage_asset(path, assets_dir):
+    # Content-addressed copy: the path Nuitka sees only changes with the bytes,
+    # so its data-file handling and our build stamp stay stable across builds.
+    key = new_stamp_hash()
+    if not hash_file(key, path):
+        return str(path)
+    staged = os.path.join(assets_dir, key.hexdigest() + os.path.splitext(path)[1])
+    if not os.path.isfile(staged):
+        os.makedirs(assets_dir, exist_ok=True)
+        tmp_path = f"{staged}.{os.getpid()}.tmp"
+        shutil.copyfile(path, tmp_path)
+        os.replace(tmp_path, staged)
+    return staged
+
+
+def artifact_candidates(app, cfg):
+    # Where Nuitka leaves the finished app for each mode, relative to the output dir.
+    exe = app["binary_name"] + (".exe" if cfg.platform == "windows" else "")
+    stem = os.path.splitext(os.path.basename(app["entry"]))[0]
+    if cfg.mode == "onefile":
+        return [exe, app["binary_name"] + ".bin"]
+    if cfg.mode == "standalone":
+        return [os.path.join(f"{stem}.dist", exe)]
+    return [
+        f"{stem}.app",
+        f"{app['binary_name']}.app",
+        f"{app['product_name']}.app",
+        f"{stem}.dist",
+    ]
+
+
+def artifact_exists(app_output_dir, app, cfg):
+    return any(
+        os.path.exists(os.path.join(app_output_dir, candidate))
+        for candidate in artifact_candidates(app, cfg)
+    )
+
+
+def read_stamp(stamp_path):
+    try:
+        with open(stamp_path, encoding="ascii") as f:
+            return f.read().strip()
+    except OSError:
+        return None
+
+
+def windows_flags(app, cfg):
+    flags = ["--windows-console-mode=disable"]
+    if LOGO_ICO_EXISTS:
+        flags.append(f"--windows-icon-from-ico={cfg.logo_path}")
+    return flags
+
+
+def macos_flags(app, cfg):
+    flags = [
+        "--macos-app-mode=gui",
+        f"--macos-target-arch={cfg.macos_arch}",
+        f"--macos-app-name={app['product_name']}",
+    ]
+    if cfg.create_dmg:
+        flags.append("--macos-app-create-dmg")
+    return flags
+
+
+def linux_flags(app, cfg):
+    return []
+
+
+PLATFORM_FLAG_BUILDERS = {
+    "windows": windows_flags,
+    "macos": macos_flags,
+    "linux": linux_flags,
+}
+
+
+def build_one(app_key, output_root, cfg, env):
+    app = APPS[app_key]
+    platform_name = cfg.platform
+    mode = cfg.mode
+
+    arch_name = cfg.macos_arch if platform_name == "macos" else "native"
+    app_output_dir = os.path.join(output_root, f"{platform_name}-{arch_name}", app_key)
+    os.makedirs(app_output_dir, exist_ok=True)
+
+    base_flags = [
         f"--mode={mode}",
+        f"--jobs={cfg.jobs}",
         "--enable-plugins=pyqt6",
         "--assume-yes-for-downloads",
-        "--remove-output",
-        f"--include-data-files={LOGO_ICO}=logo.ico",
+        f"--include-data-files={cfg.logo_path}=logo.ico",
         f"--output-dir={app_output_dir}",
         f"--output-filename={app['binary_name']}",
         f"--product-name={app['product_name']}",
@@ -101,22 +430,68 @@ def build_one(app_key, output_root):
         f"--product-version={RELEASE_VERSION}",
         f"--file-version={RELEASE_VERSION}.0",
         "--copyright=GPL-3.0-only",
-        str(app["entry"]),
+    ]
+    if mode == "onefile" and cfg.onefile_cache:
+        base_flags.append(f"--onefile-tempdir-spec={ONEFILE_CACHE_SPEC}")
+    if mode == "onefile" and not cfg.onefile_compression:
+        base_flags.append("--onefile-no-compression")
+    if not cfg.keep_intermediates:
+        base_flags.append("--remove-output")
+    platform_flags = PLATFORM_FLAG_BUILDERS[platform_name](app, cfg)
+    cmd = [
+        sys.executable,
+        nuitka_main_script(),
+        *base_flags,
+        *platform_flags,
+        app["entry"],
     ]
 
-    if platform_name == "windows":
-        cmd.insert(-1, "--windows-console-mode=disable")
-        if LOGO_ICO.exists():
-            cmd.insert(-1, f"--windows-icon-from-ico={LOGO_ICO}")
+    stamp_path = os.path.join(app_output_dir, STAMP_NAME)
+    build_key = compute_build_key(cmd)
+    # A matching stamp only counts while the built app is still there.
+    if (
+        not cfg.force
+        and read_stamp(stamp_path) == build_key
+        and artifact_exists(app_output_dir, app, cfg)
+    ):
+        write_output(
+            f"{app_key}: inputs unchanged, skipping build "
+            "(use --force to rebuild)\n".encode()
+        )
+        return
 
-    if platform_name == "macos":
-        cmd.insert(-1, "--macos-app-mode=gui")
-        cmd.insert(-1, f"--macos-target-arch={args.macos_arch}")
-        cmd.insert(-1, f"--macos-app-name={app['product_name']}")
-        if args.create_dmg:
-            cmd.insert(-1, "--macos-app-create-dmg")
+    tag = app_key if cfg.parallel > 1 else None
+    run_cmd(cmd, env=env, quiet=cfg.quiet, tag=tag)
+    with open(stamp_path, "w", encoding="ascii") as f:
+        f.write(build_key + "\n")
+
+
+def default_parallel_builds(target_count):
+    # Half the cores per concurrent Nuitka run keeps a cold C compile from thrashing RAM.
+    return max(1, min(target_count, (os.cpu_count() or 1) // 2))
+
+
+def default_compile_jobs(parallel):
+    # Split the cores between concurrent builds instead of running 2N compilers.
+    return max(1, (os.cpu_count() or 1) // parallel)
+
+
+def build_all(targets, output_root, cfg, env):
+    if cfg.parallel <= 1 or len(targets) == 1:
+        for app_key in targets:
+            build_one(app_key, output_root, cfg, env)
+        return
 
-    run_cmd(cmd)
+    # Each Nuitka run spends minutes in a mostly single-threaded analysis phase,
+    # so overlapping the apps cuts wall-clock time. The work happens in child
+    # processes, threads are enough to drive them.
+    with ThreadPoolExecutor(max_workers=cfg.parallel) as pool:
+        futures = [
+            pool.submit(build_one, app_key, output_root, cfg, env)
+            for app_key in targets
+        ]
+        for future in futures:
+            future.result()
 
 
 def parse_args():
@@ -152,6 +527,26 @@ def parse_args():
         action="store_true",
         help="Create DMG for macOS app builds.",
     )
+    parser.add_argument(
+        "--onefile-cache",
+        action="store_true",
+        help="Unpack onefile builds into a per-version user cache dir once "
+        "instead of decompressing to a temp dir on every launch.",
+    )
+    parser.add_argument(
+        "--onefile-no-compression",
+        action="store_true",
+        help="Skip payload compression for quick local onefile builds. "
+        "By default Nuitka compresses with zstd at its maximum level (22), "
+        "the smallest output at the cost of a slower final build step.",
+    )
+    parser.add_argument(
+        "--keep-intermediates",
+        action=argparse.BooleanOptionalAction,
+        default=os.environ.get("CI", "").lower() != "true",
+        help="Keep Nuitka's .build tree so the next run only recompiles what "
+        "changed. Defaults to keeping it, except on CI (CI=true).",
+    )
     parser.add_argument(
         "--output-root",
         default="build/nuitka",
@@ -162,6 +557,30 @@ def parse_args():
         action="store_true",
         help="Delete output-root before build.",
     )
+    parser.add_argument(
+        "--force",
+        action="store_true",
+        help="Rebuild even if sources and build options are unchanged.",
+    )
+    parser.add_argument(
+        "--jobs",
+        type=int,
+        default=None,
+        help="C compile jobs per Nuitka run. "
+        "Defaults to the CPU count divided by the number of parallel builds.",
+    )
+    parser.add_argument(
+        "--quiet",
+        action="store_true",
+        help="Buffer Nuitka output and print it in one block per app when done.",
+    )
+    parser.add_argument(
+        "--parallel",
+        type=int,
+        default=None,
+        help="How many apps to build at the same time. "
+        "Defaults to min(app count, CPU count / 2).",
+    )
     return parser.parse_args()
 
 
@@ -172,11 +591,32 @@ if __name__ == "__main__":
         args.platform = detect_platform_name()
 
     ensure_supported_build_path(args.platform)
+    mode = resolve_mode(args.platform, args.mode)
+    ensure_nuitka_available()
+    ensure_zstandard_for_onefile(mode, compress=not args.onefile_no_compression)
 
     output_root = ROOT / args.output_root
     if args.clean and output_root.exists():
-        shutil.rmtree(output_root)
+        remove_tree(output_root)
 
     targets = ["sender", "receiver"] if args.app == "all" else [args.app]
-    for app_key in targets:
-        build_one(app_key, output_root)
+    parallel = args.parallel
+    if parallel is None:
+        parallel = default_parallel_builds(len(targets))
+    parallel = max(1, min(parallel, len(targets)))
+    cfg = BuildCfg(
+        platform=args.platform,
+        mode=mode,
+        macos_arch=args.macos_arch,
+        create_dmg=args.create_dmg,
+        onefile_cache=args.onefile_cache,
+        onefile_compression=not args.onefile_no_compression,
+        keep_intermediates=args.keep_intermediates,
+        logo_path=stage_asset(LOGO_ICO, ASSET_CACHE_DIR),
+        jobs=args.jobs or default_compile_jobs(parallel),
+        parallel=parallel,
+        force=args.force,
+        quiet=args.quiet,
+    )
+    env = make_build_env()
+    build_all(targets, output_root, cfg, env)